@@ -1,60 +1,72 @@
 import gradio as gr
 import os
+import threading
 import traceback
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
 
-print("Initializing the Corporate Agent...")
 load_dotenv()
 
-if not all(os.getenv(key) for key in ["CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET", "OPENAI_API_KEY"]):
-    raise ValueError("CRITICAL ERROR: One or more required API keys (Cloudinary or OpenAI) are missing from your .env file.")
+if not os.getenv("OPENAI_API_KEY"):
+    raise ValueError("CRITICAL ERROR: OPENAI_API_KEY is missing from your .env file.")
 
-cloudinary.config(
-  cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
-  api_key = os.getenv("CLOUDINARY_API_KEY"),
-  api_secret = os.getenv("CLOUDINARY_API_SECRET"),
-  secure = True
-)
+from core.storage import get_storage, archive_in_background
+from core.metrics import start_metrics_server
+# Cloudinary (or local storage, if it isn't configured) is only used to archive uploads.
+storage = get_storage()
+if os.getenv("METRICS_PORT"):
+    start_metrics_server(int(os.getenv("METRICS_PORT")))
 
-from core.rag_setup import create_rag_pipeline
-from core.agent import ADGMCorporateAgent
-agent = ADGMCorporateAgent(create_rag_pipeline())
-print("Corporate Agent is ready.")
+_agent = None
+_agent_lock = threading.Lock()
+
+def get_agent():
+    """
+    Builds the agent on first use. LangChain, FAISS and the vector index are only loaded here,
+    so the UI starts serving straight away; a background warm-up usually has it ready first.
+    """
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            print("Initializing the Corporate Agent...")
+            from core.rag_setup import create_rag_pipeline
+            from core.agent import ADGMCorporateAgent
+            _agent = ADGMCorporateAgent(create_rag_pipeline())
+            print("Corporate Agent is ready.")
+    return _agent
 
 def process_documents(files):
     """
-    Main function to upload files to Cloudinary and trigger analysis.
+    Main function to analyze the uploaded files; archiving them happens in the background.
+    Yields partial reports as batches complete, then the final report and the reviewed files.
     """
     if not files:
         gr.Info("Please upload at least one document.")
-        return None, None
+        yield None, None
+        return
 
     try:
-        doc_urls = []
+        doc_paths = []
         original_filenames = []
         for file_input in files:
             file_path = file_input.name
             current_filename = os.path.basename(file_path)
-            print(f"Uploading {current_filename} to Cloudinary...")
-            
-            public_id = f"adgm_docs/{current_filename}"
-            upload_result = cloudinary.uploader.upload(file_path, resource_type="raw", public_id=public_id, overwrite=True)
-            
-            secure_url = upload_result.get('secure_url')
-            if secure_url:
-                doc_urls.append(secure_url)
-                original_filenames.append(current_filename)
-            else:
-                raise gr.Error(f"Failed to upload {current_filename}. Please check Cloudinary credentials.")
-        
-        if not doc_urls:
-            raise gr.Error("File upload to Cloudinary failed for all files.")
+            # Gradio already holds the upload on local disk, so the agent reads it from there directly.
+            doc_paths.append(file_path)
+            original_filenames.append(current_filename)
+            archive_in_background(storage, file_path, current_filename)
 
-        final_report, downloadable_file_path = agent.analyze_and_prepare_downloads(doc_urls, original_filenames)
-        
-        return final_report, downloadable_file_path
+        # Stream issues into the report as each batch finishes instead of waiting for the whole job.
+        partial_report = None
+        for event in get_agent().iter_analysis(doc_paths, original_filenames):
+            if event["type"] == "started":
+                partial_report = {**event["report"], "status": "Reviewing..."}
+            elif event["type"] == "batch":
+                partial_report["issues_found"].extend(event["issues"])
+                partial_report["status"] = f"Reviewing {event['document']}: {event['batches_done']}/{event['batches_total']} batches"
+            elif event["type"] == "done":
+                yield event["report"], event["download"]
+                return
+            yield partial_report, None
 
     except Exception as e:
         print(f"ERROR: An unhandled exception occurred.\n{traceback.format_exc()}")
@@ -72,8 +84,8 @@ with gr.Blocks(theme=gr.themes.Soft(), title="ADGM Corporate Agent") as demo:
         with gr.Column(scale=2):
             gr.Markdown("### 📝 Analysis Report")
             json_output = gr.JSON(label="Summary")
-            gr.Markdown("### 📄 Download Reviewed Document")
-            file_output = gr.File(label="Download")
+            gr.Markdown("### 📄 Download Reviewed Documents")
+            file_output = gr.File(label="Download (.zip)")
 
     analyze_btn.click(
         fn=process_documents,
@@ -82,5 +94,6 @@ with gr.Blocks(theme=gr.themes.Soft(), title="ADGM Corporate Agent") as demo:
     )
 
 if __name__ == "__main__":
-
-    demo.launch()
\ No newline at end of file
+    if os.getenv("PRELOAD_AGENT", "1") != "0":
+        threading.Thread(target=get_agent, name="agent-warmup", daemon=True).start()
+    demo.queue().launch()
\ No newline at end of file
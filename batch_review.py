@@ -0,0 +1,185 @@
+"""
+Headless bulk review. Enqueues .docx files in a local SQLite job queue and reviews them with
+several worker processes, writing the reviewed files and a consolidated report.json to an
+output directory. Completed clause batches are checkpointed, so rerunning the same command
+after a crash, timeout or Ctrl-C resumes where it stopped.
+
+    python batch_review.py client_docs/ --output reviewed/ --workers 4
+    python batch_review.py manifest.txt --output reviewed/
+
+A manifest is a text file with one .docx path per line (relative paths are resolved against
+the manifest's directory) or a JSON list of paths.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import traceback
+import zipfile
+from dotenv import load_dotenv
+
+from core.job_queue import JobQueue, JOB_QUEUE_PATH
+from core.rate_limiter import RateLimiter, DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+
+# Set in the parent before the workers are forked, so every worker shares the one loaded index.
+_RETRIEVER = None
+
+
+def collect_documents(inputs):
+    """Expands directories (recursively) and manifests into a sorted list of .docx paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(".docx") and not f.startswith("~$"))
+        elif item.lower().endswith(".docx"):
+            paths.append(item)
+        else:
+            with open(item, encoding="utf-8") as f:
+                content = f.read()
+            entries = json.loads(content) if item.lower().endswith(".json") else content.splitlines()
+            base = os.path.dirname(os.path.abspath(item))
+            paths.extend(os.path.join(base, e.strip()) for e in entries if e.strip() and not e.strip().startswith("#"))
+    return sorted(os.path.abspath(p) for p in paths)
+
+
+def _output_name(job, basenames):
+    """REVIEWED_<name>, with the job id added when several queued documents share a file name."""
+    name = os.path.basename(job["path"])
+    if basenames.get(name, 0) > 1:
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}-{job['id']}{ext}"
+    return f"REVIEWED_{name}"
+
+
+def _default_agent(retriever, rate_limiter):
+    from core.agent import ADGMCorporateAgent
+    return ADGMCorporateAgent(retriever, rate_limiter=rate_limiter)
+
+
+def _load_retriever():
+    from core.rag_setup import create_rag_pipeline
+    return create_rag_pipeline()
+
+
+def _worker_main(worker_id, queue_path, output_dir, requests_per_minute, tokens_per_minute, max_concurrency, make_agent):
+    # Connections and API clients are opened here, after the fork; only the retriever is inherited.
+    job_queue = JobQueue(queue_path)
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute, max_concurrency=max_concurrency)
+    agent = make_agent(_RETRIEVER or _load_retriever(), rate_limiter)
+    basenames = {}
+    for job in job_queue.jobs():
+        name = os.path.basename(job["path"])
+        basenames[name] = basenames.get(name, 0) + 1
+
+    while True:
+        job = job_queue.claim(worker_id)
+        if job is None:
+            break
+        name = os.path.basename(job["path"])
+        try:
+            report, download = None, None
+            for event in agent.iter_analysis([job["path"]], [name], checkpoints=job_queue.checkpoints(job["id"])):
+                if event["type"] == "done":
+                    report, download = event["report"], event["download"]
+            output_path = os.path.join(output_dir, _output_name(job, basenames))
+            with zipfile.ZipFile(download) as archive, archive.open(f"REVIEWED_{name}") as src:
+                with open(f"{output_path}.tmp", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.replace(f"{output_path}.tmp", output_path)
+            shutil.rmtree(os.path.dirname(download), ignore_errors=True)
+            job_queue.complete(job["id"], output_path, report)
+            print(f"[{worker_id}] Reviewed {name}: {len(report.get('issues_found', []))} issue(s)")
+        except Exception:
+            print(f"[{worker_id}] Failed to review {name}:\n{traceback.format_exc()}")
+            job_queue.fail(job["id"], traceback.format_exc(limit=5))
+    job_queue.close()
+
+
+def consolidated_report(job_queue):
+    """Merges every finished job's report into one pack-level report."""
+    from core.agent import ADGMCorporateAgent
+    jobs = job_queue.jobs()
+    done = [job for job in jobs if job["status"] == "done"]
+    report = ADGMCorporateAgent.checklist_report([t for job in done for t in job["report"].get("document_types", [])])
+    report["issues_found"] = [issue for job in done for issue in job["report"].get("issues_found", [])]
+    report["review_stats"] = [stats for job in done for stats in job["report"].get("review_stats", [])]
+    report["jobs"] = [
+        {"document": job["path"], "status": job["status"], "attempts": job["attempts"],
+         "output": job["output_path"], "error": job["error"]}
+        for job in jobs
+    ]
+    report["job_counts"] = job_queue.counts()
+    return report
+
+
+def run_batch(inputs, output_dir, workers=2, queue_path=JOB_QUEUE_PATH, retriever=None,
+              make_agent=_default_agent, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+              tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, max_concurrency=DEFAULT_MAX_CONCURRENCY, poll_seconds=5.0):
+    """Enqueues `inputs`, runs `workers` worker processes until the queue drains and returns the report."""
+    global _RETRIEVER
+    os.makedirs(output_dir, exist_ok=True)
+    job_queue = JobQueue(queue_path)
+    requeued = job_queue.requeue_interrupted()
+    added = job_queue.enqueue(collect_documents(inputs))
+    print(f"Queued {added} new document(s); resumed {requeued} interrupted job(s). Status: {job_queue.counts()}")
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    if context.get_start_method() == "fork":
+        # Load the index once; forked workers share its pages copy-on-write.
+        _RETRIEVER = retriever or _load_retriever()
+    # The API quota and concurrency limit are per key, so each worker gets an equal share of them.
+    share = max(1, workers)
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(f"worker-{n}", queue_path, output_dir, requests_per_minute / share, tokens_per_minute / share,
+                  max(1, max_concurrency // share), make_agent),
+        )
+        for n in range(1, workers + 1)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        while any(process.is_alive() for process in processes):
+            for process in processes:
+                process.join(timeout=poll_seconds / len(processes))
+            print(f"Status: {job_queue.counts()}")
+    except KeyboardInterrupt:
+        print("Interrupted; finished batches are checkpointed. Rerun the same command to resume.")
+        for process in processes:
+            process.terminate()
+        raise
+
+    report = consolidated_report(job_queue)
+    report_path = os.path.join(output_dir, "report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    job_queue.close()
+    print(f"Wrote {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review a directory or manifest of .docx files without the web UI.")
+    parser.add_argument("inputs", nargs="+", help="Directories, .docx files, or manifests (.txt/.json) listing .docx paths")
+    parser.add_argument("--output", required=True, help="Directory for the reviewed documents and report.json")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "2")))
+    parser.add_argument("--queue", default=JOB_QUEUE_PATH, help="SQLite job queue; reuse it to resume a run")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("CRITICAL ERROR: OPENAI_API_KEY is missing from your .env file.")
+
+    started = time.perf_counter()
+    report = run_batch(args.inputs, args.output, workers=args.workers, queue_path=args.queue)
+    print(f"Done in {time.perf_counter() - started:.1f}s: {report['job_counts']}, "
+          f"{len(report['issues_found'])} issue(s) found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import random
+from docx import Document
+
+_CLAUSES = [
+    "The Company is a private company limited by shares incorporated in the Abu Dhabi Global Market under the Companies Regulations 2020.",
+    "The liability of the members is limited to the amount, if any, unpaid on the shares held by them.",
+    "The directors may exercise all the powers of the Company, subject to these Articles and to any directions given by special resolution.",
+    "Any dispute arising out of or in connection with these Articles shall be subject to the exclusive jurisdiction of the ADGM Courts.",
+    "Any dispute arising out of or in connection with these Articles shall be subject to the exclusive jurisdiction of the Dubai Courts.",
+    "The registered office of the Company shall be situated in the Abu Dhabi Global Market at [●].",
+    "The quorum for a meeting of the directors shall be two directors, unless otherwise fixed by the directors.",
+    "Each member holding ordinary shares shall be entitled to one vote for every share held on a poll.",
+    "The Company shall keep a register of its beneficial owners in accordance with the Beneficial Ownership and Control Regulations 2022.",
+    "This agreement shall be governed by the laws of the UAE Federal Courts and the parties submit to their jurisdiction.",
+]
+# Slots combined into varied clauses, so near-duplicate dedup only collapses the genuine boilerplate.
+_SUBJECTS = [
+    "The Company", "Each director", "The board of directors", "Any member holding ordinary shares", "The company secretary",
+    "A shareholder who intends to transfer shares", "The chair of the general meeting", "Every officer of the Company",
+    "The auditors", "A person appointed as alternate director",
+]
+_OBLIGATIONS = [
+    "shall give written notice of", "must file with the Registrar", "may at any time approve", "shall keep at the registered office",
+    "shall not without prior consent effect", "is entitled to inspect", "shall within {days} days deliver", "may by ordinary resolution vary",
+    "shall promptly disclose", "must obtain the approval of the members for",
+]
+_OBJECTS = [
+    "any allotment of up to {shares} new shares", "the register of members and the register of directors",
+    "a transfer of shares with an aggregate value above USD {amount}", "the minutes of every meeting of the directors",
+    "any change to its registered office", "the annual accounts for the financial year", "a conflict of interest in a proposed transaction",
+    "the appointment or removal of a director", "a dividend of not more than {percent} percent of distributable profits",
+    "the particulars of each beneficial owner",
+]
+_CONDITIONS = [
+    "in accordance with the Companies Regulations 2020", "unless the articles provide otherwise",
+    "before the end of the next general meeting", "subject to any special resolution of the members",
+    "as soon as reasonably practicable", "within the period prescribed by the Registrar",
+    "provided that the quorum is present throughout", "where required by the ADGM Courts",
+]
+_REGULATION_SENTENCES = [
+    "A company must have a registered office in the Abu Dhabi Global Market to which all communications may be addressed.",
+    "The articles of association must be filed with the Registrar together with the application for incorporation.",
+    "Disputes relating to the constitution of a company shall be determined by the ADGM Courts.",
+    "Every company must keep a register of members and a register of directors at its registered office.",
+    "A private company must have at least one director who is a natural person.",
+    "The annual accounts must be filed with the Registrar within nine months of the end of the financial year.",
+    "A beneficial owner is an individual who ultimately owns or controls more than twenty-five percent of the shares.",
+    "An applicant for a Financial Services Permission must submit a regulatory business plan and financial projections.",
+]
+
+
+def _varied_clause(rng):
+    template = " ".join(rng.choice(slot) for slot in (_SUBJECTS, _OBLIGATIONS, _OBJECTS, _CONDITIONS)) + "."
+    return template.format(days=rng.choice([5, 7, 14, 21, 28, 30]), shares=rng.randrange(100, 100000, 100),
+                           amount=rng.randrange(10000, 5000000, 5000), percent=rng.randrange(5, 95, 5))
+
+
+def generate_docx(path, paragraphs, seed=0, boilerplate_share=0.1):
+    """
+    Writes an Articles-of-Association-style .docx with `paragraphs` numbered clauses. Most are
+    assembled from varied parts; `boilerplate_share` of them repeat a fixed set of standard
+    clauses (including non-ADGM jurisdiction ones), as real templates do.
+    """
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_heading("Articles of Association", level=1)
+    for i in range(paragraphs):
+        clause = rng.choice(_CLAUSES) if rng.random() < boilerplate_share else _varied_clause(rng)
+        doc.add_paragraph(f"{i + 1}. {clause}")
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    doc.save(path)
+    return path
+
+
+def generate_sources(directory, files=5, sentences_per_file=400, seed=0):
+    """Writes synthetic regulation text as .html sources (stored as extracted text, like real downloads)."""
+    rng = random.Random(seed)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    for i in range(files):
+        text = "\n".join(rng.choice(_REGULATION_SENTENCES) for _ in range(sentences_per_file))
+        with open(os.path.join(directory, f"Synthetic_Regulation_{i + 1}.html"), "w", encoding="utf-8") as f:
+            f.write(text)
+    return directory
+
+
+def generate_html_page(seed=0, sentences=400):
+    """A regulation page as the regulator's website would serve it, script and markup included."""
+    rng = random.Random(seed)
+    body = "".join(f"<p>{rng.choice(_REGULATION_SENTENCES)}</p>" for _ in range(sentences))
+    return (f"<html><head><script>var page = {seed};</script></head>"
+            f"<body><h1>Regulation {seed}</h1>{body}</body></html>").encode("utf-8")
+
+
+def generate_queries(count=200, clauses_per_query=3, seed=0):
+    """Retrieval queries shaped like batched clause prompts: a few document clauses joined together."""
+    rng = random.Random(seed)
+    return ["\n\n".join(rng.choice(_CLAUSES) for _ in range(clauses_per_query)) for _ in range(count)]
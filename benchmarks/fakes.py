@@ -0,0 +1,73 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from core.rate_limiter import estimate_tokens
+
+# Phrases the fake reviewer "flags", so comments are actually written during a run.
+_RED_FLAGS = {
+    "dubai courts": ("Refers to Dubai Courts instead of ADGM Courts.", "High"),
+    "uae federal courts": ("Refers to UAE Federal Courts instead of ADGM Courts.", "High"),
+    "[●]": ("Contains a blank placeholder.", "Medium"),
+}
+_counter_lock = threading.Lock()
+_CLAUSE_HEADER = re.compile(r"Clause (\d+)(?: \(part \d+ of \d+\))?:\n\"\"\"\n(.*?)\n\"\"\"", re.S)
+
+
+class FakeLLM(LLM):
+    """Deterministic stand-in for ChatOpenAI: flags known red-flag phrases after a fixed latency."""
+
+    latency: float = 0.05
+    model_name: str = "fake-llm"
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        # A lock can't be a pydantic field, so the counters are guarded by a module-level one.
+        with _counter_lock:
+            self.calls += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+        clauses_block = prompt.split("**Document Clauses to Review:**", 1)[-1]
+        issues = []
+        for number, text in _CLAUSE_HEADER.findall(clauses_block):
+            lowered = text.lower()
+            for phrase, (issue, severity) in _RED_FLAGS.items():
+                if phrase in lowered:
+                    issues.append({"clause_number": int(number), "issue": issue, "severity": severity,
+                                   "suggestion": "Replace with the ADGM-compliant wording."})
+        return json.dumps(issues)
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: offline, deterministic, and similar texts land close together."""
+
+    def __init__(self, dimensions=256, latency=0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.model = f"fake-embeddings-{dimensions}"
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little") % self.dimensions
+            vector[bucket] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,70 @@
+"""
+Retrieval quality and cost of the compressed (IVF-PQ) index and hybrid retrieval, measured
+against exact search on the flat index: recall@k, per-query latency and index size.
+"""
+import os
+import time
+import numpy as np
+from core.rag_setup import COMPRESSED_INDEX_FILENAME, MIN_COMPRESSED_VECTORS, build_compressed_index, load_vector_store
+from core.retrieval import BatchRetriever
+
+
+def _recall(approx, exact):
+    """Mean fraction of each query's exact top-k that the approximate search also returned."""
+    hits = [len(set(a[a != -1]) & set(e[e != -1])) / max(1, (e != -1).sum()) for a, e in zip(approx, exact)]
+    return round(float(np.mean(hits)), 4)
+
+
+def _timed_search(index, matrix, k):
+    started = time.perf_counter()
+    _, indices = index.search(matrix, k)
+    return indices, round((time.perf_counter() - started) * 1000 / len(matrix), 4)
+
+
+def _measure_compressed(flat_index, vector_store_path, matrix, exact, k, nprobes):
+    import faiss
+    started = time.perf_counter()
+    compressed, params = build_compressed_index(flat_index)
+    compressed_path = os.path.join(vector_store_path, COMPRESSED_INDEX_FILENAME)
+    faiss.write_index(compressed, compressed_path)
+    results = {
+        **params,
+        "build_seconds": round(time.perf_counter() - started, 4),
+        "index_mb": round(os.path.getsize(compressed_path) / 2**20, 3),
+        "nprobe": [],
+    }
+    ivf = faiss.extract_index_ivf(compressed)
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        approx, ms = _timed_search(compressed, matrix, k)
+        results["nprobe"].append({"nprobe": nprobe, f"recall_at_{k}": _recall(approx, exact), "ms_per_query": ms})
+    return results
+
+
+def measure_recall(vector_store_path, embeddings, queries, k=4, nprobes=(1, 4, 16, 64)):
+    flat_store = load_vector_store(vector_store_path, embeddings, mmap=False)
+    matrix = np.array(embeddings.embed_documents(queries), dtype=np.float32)
+    exact, flat_ms = _timed_search(flat_store.index, matrix, k)
+    results = {
+        "k": k,
+        "queries": len(queries),
+        "vectors": flat_store.index.ntotal,
+        "flat": {"ms_per_query": flat_ms, "index_mb": round(os.path.getsize(os.path.join(vector_store_path, "index.faiss")) / 2**20, 3)},
+    }
+
+    if flat_store.index.ntotal < MIN_COMPRESSED_VECTORS:
+        results["ivfpq"] = {"skipped": f"needs at least {MIN_COMPRESSED_VECTORS} vectors to train"}
+    else:
+        results["ivfpq"] = _measure_compressed(flat_store.index, vector_store_path, matrix, exact, k, nprobes)
+
+    # Hybrid retrieval deliberately departs from pure vector ranking; overlap shows by how much.
+    retriever = flat_store.as_retriever(search_kwargs={"k": k})
+    started = time.perf_counter()
+    hybrid_docs = BatchRetriever(retriever, cache_size=0, mode="hybrid").retrieve_many(queries)
+    hybrid_ms = round((time.perf_counter() - started) * 1000 / len(queries), 4)
+    position_of = {id(flat_store.docstore.search(doc_id)): i for i, doc_id in flat_store.index_to_docstore_id.items()}
+    hybrid = np.full((len(queries), k), -1)
+    for row, docs in enumerate(hybrid_docs):
+        hybrid[row, :len(docs)] = [position_of[id(doc)] for doc in docs]
+    results["hybrid"] = {f"overlap_with_flat_at_{k}": _recall(hybrid, exact), "ms_per_query": hybrid_ms}
+    return results
@@ -0,0 +1,167 @@
+"""
+Offline benchmark for the review pipeline.
+
+    python -m benchmarks.run --sizes 10 100 1000 --llm-latency 0.2 --output bench_results.json
+
+Everything runs against FakeLLM/FakeEmbeddings and a synthetic corpus, so no API keys or
+network access are needed. Results are written as JSON so runs can be diffed.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from core.agent import ADGMCorporateAgent
+from core.embedding_cache import EmbeddingCache
+from core.rag_setup import create_rag_pipeline
+from core.rate_limiter import RateLimiter
+from core.review_cache import ReviewCache
+from benchmarks.corpus import generate_docx, generate_queries, generate_sources
+from benchmarks.fakes import FakeEmbeddings, FakeLLM
+from benchmarks.recall import measure_recall
+from benchmarks.startup import measure_startup
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def build_index(workdir, embeddings, source_files):
+    source_dir = generate_sources(os.path.join(workdir, "sources"), files=source_files)
+    started = time.perf_counter()
+    retriever = create_rag_pipeline(
+        embeddings=embeddings,
+        source_dir=source_dir,
+        vector_store_path=os.path.join(workdir, "faiss_index"),
+        embedding_cache=EmbeddingCache(os.path.join(workdir, "embedding_cache.sqlite")),
+        download=False,
+    )
+    return retriever, time.perf_counter() - started
+
+
+def bench_document(agent, llm, path, paragraphs):
+    batch_latencies = []
+    review_batch = agent._review_batch
+
+    def timed_review_batch(*args):
+        started = time.perf_counter()
+        try:
+            return review_batch(*args)
+        finally:
+            batch_latencies.append(time.perf_counter() - started)
+
+    agent._review_batch = timed_review_batch
+    calls_before, tokens_before = llm.calls, llm.prompt_tokens
+    started = time.perf_counter()
+    try:
+        report, _ = agent.analyze_and_prepare_downloads([path], [os.path.basename(path)])
+    finally:
+        agent._review_batch = review_batch
+    elapsed = time.perf_counter() - started
+
+    stats = report["review_stats"][0]
+    return {
+        "paragraphs": paragraphs,
+        "clauses": stats["clauses_extracted"],
+        "clauses_sent_to_llm": stats["clauses"],
+        "seconds": round(elapsed, 4),
+        "clauses_per_second": round(stats["clauses_extracted"] / elapsed, 2) if elapsed else None,
+        "batches": len(batch_latencies),
+        "batch_latency_p50_s": percentile(sorted(batch_latencies), 50),
+        "batch_latency_p95_s": percentile(sorted(batch_latencies), 95),
+        "llm_calls": llm.calls - calls_before,
+        "prompt_tokens": llm.prompt_tokens - tokens_before,
+        "context_tokens_retrieved": report["context"]["tokens_retrieved"],
+        "context_tokens_sent": report["context"]["tokens_sent"],
+        "issues_found": len(report["issues_found"]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run(sizes, llm_latency, source_files, max_concurrency, startup_processes=2, recall_k=4, nprobes=(1, 4, 16, 64)):
+    with tempfile.TemporaryDirectory(prefix="adgm_bench_") as workdir:
+        embeddings = FakeEmbeddings()
+        retriever, index_seconds = build_index(workdir, embeddings, source_files)
+        # Fresh processes loading the index just built: copied onto each heap vs. memory-mapped and shared.
+        startup = {}
+        if startup_processes:
+            for mode, mmap in (("heap", False), ("mmap", True)):
+                startup[mode] = measure_startup(os.path.join(workdir, "faiss_index"), startup_processes, mmap)
+                print(f"Startup ({mode}): " + ", ".join(
+                    f"{p['startup_s']}s / {p.get('pss_mb', p['peak_rss_mb'])} MB" for p in startup[mode]))
+        retrieval = measure_recall(os.path.join(workdir, "faiss_index"), embeddings, generate_queries(), recall_k, nprobes)
+        for probe in retrieval["ivfpq"].get("nprobe", []):
+            print(f"IVF-PQ nprobe={probe['nprobe']}: recall@{recall_k} {probe[f'recall_at_{recall_k}']}, "
+                  f"{probe['ms_per_query']} ms/query")
+        llm = FakeLLM(latency=llm_latency)
+        agent = ADGMCorporateAgent(
+            retriever,
+            llm=llm,
+            max_concurrency=max_concurrency,
+            # The fake has no quota; keep the limiter in the path but never let it throttle.
+            rate_limiter=RateLimiter(requests_per_minute=1e9, tokens_per_minute=1e12),
+            # A fresh cache per run, so every run measures cold reviews.
+            review_cache=ReviewCache(os.path.join(workdir, "review_cache.sqlite")),
+            prometheus_path=os.path.join(workdir, "metrics.prom"),
+        )
+        documents = []
+        for size in sizes:
+            path = generate_docx(os.path.join(workdir, "docs", f"articles_{size}.docx"), size, seed=size)
+            documents.append(bench_document(agent, llm, path, size))
+            print(f"{size:>5} paragraphs: {documents[-1]['clauses_per_second']} clauses/s, "
+                  f"{documents[-1]['llm_calls']} LLM calls")
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {"llm_latency_s": llm_latency, "source_files": source_files, "max_concurrency": max_concurrency,
+                     "startup_processes": startup_processes, "recall_k": recall_k, "nprobes": list(nprobes)},
+        "index_build_seconds": round(index_seconds, 4),
+        "startup": startup,
+        "retrieval": retrieval,
+        "documents": documents,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for the ADGM review pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Paragraphs per synthetic document (10-5000).")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake LLM takes per call.")
+    parser.add_argument("--source-files", type=int, default=16,
+                        help="Synthetic regulation files to index. The default gives ~800 vectors, enough to train "
+                             "IVF-PQ with 4-bit codebooks; 8-bit codebooks need ~200 files (10,000 vectors).")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--startup-processes", type=int, default=2,
+                        help="Processes to cold-start side by side when measuring startup time and RSS (0 to skip).")
+    parser.add_argument("--recall-k", type=int, default=4, help="k for recall@k of the IVF-PQ index against the flat index.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="IVF lists probed per query.")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    if any(not 10 <= size <= 5000 for size in args.sizes):
+        parser.error("--sizes must be between 10 and 5000 paragraphs")
+
+    results = run(args.sizes, args.llm_latency, args.source_files, args.max_concurrency, args.startup_processes,
+                  args.recall_k, args.nprobe)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the regulator's website: serves fixed pages with ETag and Last-Modified
+validators, answers conditional GETs with 304, and can add a fixed latency per request so
+the effect of concurrent fetching is visible without network access.
+"""
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SourceServer:
+    """
+    Serves {path: (content bytes, content type)} on localhost. Use as a context manager;
+    `url(path)` gives the address of a page and `requests` counts responses by status code.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = {}
+        self.latency = latency
+        self.requests = {}
+        self._lock = threading.Lock()
+        for path, (content, content_type) in pages.items():
+            self.set_page(path, content, content_type)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def set_page(self, path, content, content_type="text/html; charset=utf-8"):
+        """Adds or replaces a page, giving it fresh validators."""
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:16]
+        self.pages[path] = (content, content_type, etag, formatdate(time.time(), usegmt=True))
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def _count(self, status):
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                page = server.pages.get(self.path)
+                if page is None:
+                    server._count(404)
+                    self.send_error(404)
+                    return
+                content, content_type, etag, last_modified = page
+                if self.headers.get("If-None-Match") == etag or (
+                    "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified
+                ):
+                    server._count(304)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                server._count(200)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
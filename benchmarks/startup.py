@@ -0,0 +1,103 @@
+"""
+Cold-start cost of a review process: import time, index load time and memory.
+
+Each measured process is a fresh interpreter that imports the pipeline, loads the vector
+index and runs one search, then waits until every sibling has done the same. Memory is read
+while they are all alive, so PSS (proportional set size) shows how much of the index the
+processes actually share.
+
+    python -m benchmarks.startup faiss_index --processes 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+_SMAPS_FIELDS = {"Rss": "rss_mb", "Pss": "pss_mb", "Private_Clean": "private_mb", "Private_Dirty": "private_mb"}
+
+
+def _memory_mb(pid):
+    """RSS, PSS and private memory of `pid` from /proc (Linux only); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    memory = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in _SMAPS_FIELDS:
+            key = _SMAPS_FIELDS[field]
+            memory[key] = memory.get(key, 0) + int(value.split()[0]) / 1024
+    return {key: round(value, 1) for key, value in memory.items()}
+
+
+def measure_startup(vector_store_path, processes=2, mmap=True):
+    """Starts `processes` loaders of `vector_store_path` side by side; returns one dict per process."""
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.startup", vector_store_path, "--child", "--mmap" if mmap else "--no-mmap"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        for _ in range(processes)
+    ]
+    results = []
+    try:
+        # Each child prints its timings once loaded, then blocks on stdin until released.
+        for child in children:
+            results.append(json.loads(child.stdout.readline()))
+        for child, result in zip(children, results):
+            memory = _memory_mb(child.pid)
+            if memory:
+                result.update(memory)
+    finally:
+        for child in children:
+            child.stdin.close()
+            child.wait()
+    return results
+
+
+def _child(vector_store_path, mmap):
+    started = time.perf_counter()
+    from core.agent import ADGMCorporateAgent  # noqa: F401 - the import cost is what's measured
+    from core.rag_setup import load_vector_store
+    import_seconds = time.perf_counter() - started
+
+    from benchmarks.fakes import FakeEmbeddings
+    started = time.perf_counter()
+    store = load_vector_store(vector_store_path, FakeEmbeddings(), mmap=mmap)
+    store.similarity_search("share capital of the company", k=4)
+    load_seconds = time.perf_counter() - started
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mmap": mmap,
+        "import_s": round(import_seconds, 4),
+        "index_load_s": round(load_seconds, 4),
+        "startup_s": round(import_seconds + load_seconds, 4),
+        "peak_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+    }), flush=True)
+    sys.stdin.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-process startup time and memory.")
+    parser.add_argument("vector_store_path")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--mmap", dest="mmap", action="store_true", default=True)
+    parser.add_argument("--no-mmap", dest="mmap", action="store_false")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.vector_store_path, args.mmap)
+        return
+    print(json.dumps(measure_startup(args.vector_store_path, args.processes, args.mmap), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 import os
+import copy
 import json
-import requests
+import hashlib
+import queue
+from collections import Counter
 import tempfile
-from docx import Document
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from langchain_openai import ChatOpenAI # Changed from Google to OpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from core.docx_handler import add_comment, save_document
+from langchain_community.callbacks.manager import get_openai_callback
+from core.docx_handler import add_comment, save_documents_to_zip
+from core.rate_limiter import RateLimiter, DEFAULT_MAX_CONCURRENCY, estimate_tokens
+from core.batching import plan_batches, join_batch, context_reservation, DEFAULT_PROMPT_TOKEN_BUDGET, MIN_CLAUSE_CHARS
+from core.review_cache import ReviewCache, chunk_id
+from core.retrieval import BatchRetriever, merge_results
+from core.context import assemble_context, CONTEXT_TOKEN_BUDGET, CONTEXT_TOKENS_PER_CLAUSE
+from core.rag_setup import CHUNK_SIZE
+from core.document_sources import as_document_source
+from core.classifier import DocTypeClassifier, CLASSIFY_CHARS
+from core.prefilter import apply_rules, drop_restated, is_conclusive
+from core.dedup import group_near_duplicates, FanOut
+from core.docx_stream import iter_clauses, open_for_annotation, find_body_paragraphs, UnmodifiedDocx, BODY_PART
+from core.metrics import Metrics, METRICS, METRICS_PROMETHEUS_PATH
+
+MAX_PARALLEL_DOCUMENTS = int(os.getenv("MAX_PARALLEL_DOCUMENTS", "3"))
+
+# Headroom reserved for the model's answer when charging a call against the tokens-per-minute quota.
+COMPLETION_TOKEN_ALLOWANCE = 500
 
 # Checklists and Keywords are defined here and are complete
 ADGM_CHECKLISTS = {
@@ -25,14 +48,33 @@ DOC_TYPE_KEYWORDS = {
 }
 
 class ADGMCorporateAgent:
-    def __init__(self, retriever):
+    def __init__(self, retriever, llm=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None,
+                 prompt_token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, review_cache=None,
+                 max_parallel_documents=MAX_PARALLEL_DOCUMENTS, context_token_budget=CONTEXT_TOKEN_BUDGET,
+                 context_tokens_per_clause=CONTEXT_TOKENS_PER_CLAUSE,
+                 prometheus_path=METRICS_PROMETHEUS_PATH):
         self.retriever = retriever
+        self.prometheus_path = prometheus_path
+        self.batch_retriever = BatchRetriever(retriever)
         # --- MAJOR CHANGE HERE ---
         # Swapped ChatGoogleGenerativeAI with ChatOpenAI and specified a GPT model
-        self.llm = ChatOpenAI(model_name="gpt-4o", temperature=0.2)
+        self.llm = llm or ChatOpenAI(model_name="gpt-4o", temperature=0.2)
         # --- END OF MAJOR CHANGE ---
+        self.classifier = DocTypeClassifier(DOC_TYPE_KEYWORDS, ADGM_CHECKLISTS)
         self.prompt_template = self._create_prompt_template()
+        # Any edit to the prompt wording changes the version and so invalidates cached reviews.
+        self.prompt_version = hashlib.sha256(self.prompt_template.template.encode("utf-8")).hexdigest()[:12]
         self.llm_chain = LLMChain(prompt=self.prompt_template, llm=self.llm)
+        # Batches are reviewed concurrently; pacing comes from the shared quota limiter, not fixed sleeps.
+        self.max_concurrency = max(1, int(max_concurrency))
+        # One cap on LLM calls in flight for the whole agent, however many documents are being reviewed at once.
+        self._llm_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_parallel_documents = max(1, int(max_parallel_documents))
+        self.prompt_token_budget = prompt_token_budget
+        self.context_token_budget = context_token_budget
+        self.context_tokens_per_clause = context_tokens_per_clause
+        self.review_cache = review_cache or ReviewCache()
 
     def _create_prompt_template(self):
         template = """
@@ -56,15 +98,39 @@ class ADGMCorporateAgent:
         """
         return PromptTemplate(template=template, input_variables=["context", "clauses_batch"])
 
-    def _identify_doc_type(self, filename):
-        filename_lower = filename.lower()
-        for doc_type, keywords in DOC_TYPE_KEYWORDS.items():
-            if any(keyword in filename_lower for keyword in keywords):
-                return doc_type
-        return "Unknown Document"
+    def _context_allowance(self):
+        """Context tokens per clause: the configured allowance, but no more than its k retrieved chunks could fill."""
+        k = getattr(self.retriever, "search_kwargs", {}).get("k", 4)
+        return min(estimate_tokens("x" * (k * CHUNK_SIZE)), self.context_tokens_per_clause)
+
+    def _estimate_context_tokens(self, clauses):
+        """Context reserved for a prompt of `clauses` clauses: the per-clause allowance each, up to the context cap."""
+        return context_reservation(clauses, self.context_token_budget, self._context_allowance())
+
+    def _plan_batches(self, clauses):
+        """Packs (clause_number, text) pairs into as few prompts as fit the token budget."""
+        template_tokens = estimate_tokens(self.prompt_template.format(context="", clauses_batch=""))
+        return plan_batches(clauses, template_tokens, self.context_token_budget, self.prompt_token_budget,
+                            self._context_allowance())
+
+    def _identify_doc_type(self, filename, text=None):
+        return self.classifier.classify(filename, text)["doc_type"]
+
+    def check_missing_documents(self, original_filenames, texts=None):
+        """
+        Works out the ADGM process and missing checklist documents. When the documents' opening
+        text is available it is classified by content, falling back to the filename.
+        """
+        texts = texts or [None] * len(original_filenames)
+        classifications = [self.classifier.classify(name, text) for name, text in zip(original_filenames, texts)]
+        document_types = [{"document": name, **c} for name, c in zip(original_filenames, classifications)]
+        return self.checklist_report(document_types)
 
-    def check_missing_documents(self, original_filenames):
-        uploaded_doc_types = {self._identify_doc_type(name) for name in original_filenames}
+    @staticmethod
+    def checklist_report(document_types):
+        """Builds the checklist report from per-document classifications (as in report["document_types"])."""
+        original_filenames = [d["document"] for d in document_types]
+        uploaded_doc_types = {d["doc_type"] for d in document_types}
         process = "Unknown"
         if any(doc in uploaded_doc_types for doc in {"Articles of Association", "Board Resolution for Incorporation"}):
             process = "Company Incorporation"
@@ -76,94 +142,390 @@ class ADGMCorporateAgent:
         if process in ADGM_CHECKLISTS:
             checklist = ADGM_CHECKLISTS[process]
             missing = list(set(checklist["docs"]) - uploaded_doc_types)
-            return {"process": process, "documents_uploaded": len(original_filenames), "required_documents": checklist["required_docs"], "missing_documents": missing}
-        return {"process": "Unknown", "missing_documents": []}
+            return {"process": process, "documents_uploaded": len(original_filenames), "required_documents": checklist["required_docs"], "missing_documents": missing, "document_types": document_types}
+        return {"process": "Unknown", "missing_documents": [], "document_types": document_types}
+
+    def _invoke_review(self, context, clauses_batch_str, metrics=METRICS, document=None):
+        """Sends one prompt to the LLM; returns the parsed issue list, or None if the reply was unusable."""
+        inputs = {"context": context, "clauses_batch": clauses_batch_str}
+        prompt_tokens = estimate_tokens(self.prompt_template.format(**inputs))
+        usage = {}
 
-    def _analyze_single_document_from_url(self, docx_url, original_filename):
-        # We need the time module to add a delay for free-tier APIs
-        import time
+        def invoke():
+            # The OpenAI callback reports real token usage; other models fall back to estimates.
+            with self._llm_slots, get_openai_callback() as cb:
+                response = self.llm_chain.invoke(inputs)
+            usage["prompt_tokens"] = cb.prompt_tokens or prompt_tokens
+            usage["completion_tokens"] = cb.completion_tokens or estimate_tokens(response.get('text') or "")
+            return response
 
-        temp_path = None
+        with metrics.span("llm", document=document):
+            response = self.rate_limiter.call(
+                invoke, prompt_tokens + COMPLETION_TOKEN_ALLOWANCE,
+                on_retry=lambda delay: metrics.increment("llm_retries", document=document),
+            )
+        metrics.increment("llm_calls", document=document)
+        metrics.increment("prompt_tokens", usage["prompt_tokens"], document=document)
+        metrics.increment("completion_tokens", usage["completion_tokens"], document=document)
         try:
-            response = requests.get(docx_url, timeout=30)
-            response.raise_for_status()
+            results = json.loads(response['text'])
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return None
+        return results if isinstance(results, list) else None
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_f:
-                temp_f.write(response.content)
-                temp_path = temp_f.name
+    def _review_batch(self, batch, clause_docs, metrics=METRICS, document=None, batch_number=None):
+        """
+        Reviews one planned batch against the context retrieved for its clauses (`clause_docs`
+        holds one list of chunks per batch entry), serving clauses from the review cache where
+        possible. Returns (issues, number of clauses served from cache).
+        """
+        started = time.perf_counter()
+        model_name = getattr(self.llm, "model_name", "")
 
-            doc = Document(temp_path)
-            issues_found = []
+        keys = [
+            self.review_cache.make_key(text, [chunk_id(d) for d in docs], self.prompt_version, model_name)
+            for (_, text, _), docs in zip(batch, clause_docs)
+        ]
+        # One lookup for the whole batch rather than a round trip (and lock) per clause.
+        found = self.review_cache.get_many(keys)
+        results, misses = [], []
+        for (clause_number, _, formatted), key in zip(batch, keys):
+            cached = found.get(key)
+            if cached is None:
+                misses.append((key, clause_number, formatted))
+            else:
+                # Cached issues are stored without clause numbers, since those shift between revisions.
+                results.extend({**issue, "clause_number": clause_number} for issue in cached)
 
-            paragraphs = [p for p in doc.paragraphs if len(p.text.strip()) > 20]
-            
+        if misses:
+            # Context is only assembled for batches that actually reach the LLM.
+            clauses_batch_str = "\n\n".join(formatted for _, _, formatted in misses)
+            with metrics.span("context_assembly", document=document):
+                context, context_report = assemble_context(merge_results(clause_docs), clauses_batch_str,
+                                                           self._estimate_context_tokens(len(misses)))
+            for name in ("tokens_retrieved", "tokens_sent", "chunks_merged", "duplicates_dropped", "passages_truncated"):
+                metrics.increment(f"context_{name}", context_report[name], document=document)
+            llm_results = self._invoke_review(context, clauses_batch_str, metrics, document)
+            if llm_results is not None:
+                results.extend(llm_results)
+                by_clause = {}
+                for result in llm_results:
+                    if isinstance(result, dict):
+                        issue = {k: v for k, v in result.items() if k != "clause_number"}
+                        by_clause.setdefault(result.get("clause_number"), []).append(issue)
+                # Parts of a split clause share one number; only the first part carries its issues.
+                stored, entries = set(), {}
+                for key, clause_number, _ in misses:
+                    entries[key] = by_clause.get(clause_number, []) if clause_number not in stored else []
+                    stored.add(clause_number)
+                self.review_cache.set_many(entries)
+
+        hits = len(batch) - len(misses)
+        metrics.increment("review_cache_hits", hits, document=document)
+        metrics.increment("review_cache_misses", len(misses), document=document)
+        metrics.record_batch(document=document, batch=batch_number, clauses=len(batch), cache_hits=hits,
+                             seconds=round(time.perf_counter() - started, 4), llm_call=bool(misses))
+        return results, hits
 
-            batch_size = 2 
-
-            for i in range(0, len(paragraphs), batch_size):
-                batch = paragraphs[i:i+batch_size]
-                
-                clauses_for_prompt = []
-                for j, para in enumerate(batch):
-                    clauses_for_prompt.append(f"Clause {i+j+1}:\n\"\"\"\n{para.text}\n\"\"\"")
-                
-                clauses_batch_str = "\n\n".join(clauses_for_prompt)
-                
-                context_docs = self.retriever.get_relevant_documents(clauses_batch_str)
-                context = "\n".join([d.page_content for d in context_docs])
-                
-                response = self.llm_chain.invoke({"context": context, "clauses_batch": clauses_batch_str})
-                
+    def _collect_results(self, results, clauses, original_filename, pending_comments):
+        """
+        Turns reported issues into report entries. Comments for body paragraphs are queued in
+        `pending_comments` (paragraph index -> comment texts) and written in one pass at the end.
+        """
+        issues_found = []
+        for result in results:
+            if not isinstance(result, dict):
+                continue
+            try:
+                clause_num = result.get('clause_number')
+                if clause_num and 1 <= clause_num <= len(clauses):
+                    clause = clauses[clause_num - 1]
+                    
+                    comment_text = f"Issue: {result.get('issue', '')}\nSuggestion: {result.get('suggestion', '')}"
+                    # Word can't anchor comments in headers/footers; those issues are reported only.
+                    if clause["part"] == BODY_PART:
+                        pending_comments.setdefault(clause["index"], []).append(comment_text)
+                    
+                    if clause["part"] != BODY_PART:
+                        location = f"{os.path.basename(clause['part'])[:-4].capitalize()} paragraph"
+                    else:
+                        location = "Table cell" if clause["in_table"] else "Paragraph"
+                    issue_details = {
+                        "document": original_filename,
+                        "section": f"{location} starting with: '{clause['text'][:50]}...'",
+                        "issue": result.get('issue'),
+                        "severity": result.get('severity', 'Medium'),
+                        "suggestion": result.get('suggestion')
+                    }
+                    issues_found.append(issue_details)
+            except (KeyError, IndexError, TypeError):
+                pass
+        return issues_found
+
+    def _write_comments(self, stream, pending_comments):
+        """Opens the full object model only to annotate the paragraphs that received issues."""
+        if not pending_comments:
+            return UnmodifiedDocx(stream)
+        doc = open_for_annotation(stream)
+        paragraphs = find_body_paragraphs(doc, pending_comments)
+        for index in sorted(paragraphs):
+            for comment_text in pending_comments[index]:
+                # The issue is already in the report; a paragraph that can't be annotated mustn't sink the run.
                 try:
-                    results = json.loads(response['text'])
-                    if not isinstance(results, list):
-                        continue
+                    if add_comment(paragraphs[index], comment_text) is None:
+                        print(f"Paragraph {index} has no text runs to anchor a comment on; issue reported only.")
+                except Exception as e:
+                    print(f"Could not add a comment to paragraph {index}: {e}")
+        return doc
 
-                    for result in results:
-                        clause_num = result.get('clause_number')
-                        if clause_num and 1 <= clause_num <= len(paragraphs):
-                            para_to_comment = paragraphs[clause_num - 1]
-                            
-                            comment_text = f"Issue: {result.get('issue', '')}\nSuggestion: {result.get('suggestion', '')}"
-                            add_comment(para_to_comment, comment_text)
-                            
-                            issue_details = {
-                                "document": original_filename,
-                                "section": f"Paragraph starting with: '{para_to_comment.text[:50]}...'",
-                                "issue": result.get('issue'),
-                                "severity": result.get('severity', 'Medium'),
-                                "suggestion": result.get('suggestion')
-                            }
-                            issues_found.append(issue_details)
-                except (json.JSONDecodeError, KeyError, IndexError, TypeError):
-                    pass
+    def _extract_document(self, source, original_filename, metrics=METRICS):
+        """Fetches a document from a URL, local path, bytes or file-like object and streams out its clauses."""
+        with metrics.span("fetch_document", document=original_filename):
+            stream = as_document_source(source).open()
+        # Clause text is streamed out of word/document.xml; the python-docx model is only built at write-back.
+        with metrics.span("parse_document", document=original_filename):
+            clauses, opening = [], []
+            opening_length = 0
+            for clause in iter_clauses(stream):
+                # Short lines (titles, headings) aren't reviewed but are what best identifies the document type.
+                if opening_length < CLASSIFY_CHARS:
+                    opening.append(clause["text"])
+                    opening_length += len(clause["text"]) + 1
+                if len(clause["text"].strip()) > MIN_CLAUSE_CHARS:
+                    clauses.append(clause)
+        return stream, clauses, "\n".join(opening)
+
+    def _plan_duplicates(self, documents):
+        """
+        Groups near-duplicate clauses within and across documents (as returned by _extract_document).
+        Returns two lists with one dict per document: {clause position: group} for the
+        representatives that have duplicates, and for the duplicates themselves.
+        """
+        positions = [(d, i) for d, (_, clauses, _) in enumerate(documents) for i in range(len(clauses))]
+        groups = group_near_duplicates([documents[d][1][i]["text"] for d, i in positions])
+        group_sizes = Counter(groups)
+        representatives = [{} for _ in documents]
+        duplicates = [{} for _ in documents]
+        for flat_index, (d, i) in enumerate(positions):
+            group = groups[flat_index]
+            if group_sizes[group] < 2:
+                continue
+            if group == flat_index:
+                representatives[d][i] = group
+            else:
+                duplicates[d][i] = group
+        return representatives, duplicates
 
-                time.sleep(70) 
+    @staticmethod
+    def _batch_key(batch):
+        """Content-addressed id for a planned batch; stable across runs over the same document."""
+        return hashlib.sha256(join_batch(batch).encode("utf-8")).hexdigest()
+
+    def _review_document(self, stream, clauses, original_filename, on_batch=None, metrics=METRICS,
+                         representatives=None, duplicates=None, fan_out=None, checkpoints=None):
+        """
+        Reviews one extracted document. Deterministic rules run first; the LLM then sees every clause
+        except those with a conclusive rule hit and near-duplicates of a clause reviewed elsewhere,
+        which get their representative's issues through `fan_out`. If given,
+        `on_batch(issues, steps_done, steps_total)` is called as each step's issues are applied, and
+        each finished batch is saved to `checkpoints` (get/put by batch key) so a rerun skips it.
+        """
+        representatives = representatives or {}
+        duplicates = duplicates or {}
+        fan_out = fan_out or FanOut()
+        issues_found = []
+        pending_comments = {}
+
+        def emit(results, done, total):
+            step_issues = self._collect_results(results, clauses, original_filename, pending_comments)
+            issues_found.extend(step_issues)
+            if on_batch:
+                on_batch(step_issues, done, total)
+
+        try:
+            rule_results, conclusive, rule_issues_by_clause = [], set(), {}
+            with metrics.span("prefilter", document=original_filename):
+                for number, clause in enumerate(clauses, start=1):
+                    rule_issues = apply_rules(clause["text"])
+                    rule_results.extend({**issue, "clause_number": number} for issue in rule_issues)
+                    if rule_issues:
+                        rule_issues_by_clause[number] = rule_issues
+                    if is_conclusive(rule_issues):
+                        conclusive.add(number)
+                        if number - 1 in representatives:
+                            fan_out.publish(representatives[number - 1], [])
+            to_review = [
+                (number, clause["text"]) for number, clause in enumerate(clauses, start=1)
+                if number not in conclusive and number - 1 not in duplicates
+            ]
 
-            return doc, issues_found
+            with metrics.span("plan_batches", document=original_filename):
+                batches, batching_report = self._plan_batches(to_review)
+            stats = {"document": original_filename, "clauses_extracted": len(clauses), **batching_report,
+                     "cache_hits": 0, "llm_calls": 0, "checkpoint_restored": 0,
+                     "rule_issues": len(rule_results), "prefilter_skipped": len(conclusive),
+                     "duplicates_skipped": len(duplicates)}
+            metrics.increment("prefilter_skipped", len(conclusive), document=original_filename)
+            metrics.increment("duplicates_skipped", len(duplicates), document=original_filename)
+            # Steps: the rule pass, each LLM batch, then the fan-out to duplicates.
+            total_steps = len(batches) + 2
+            emit(rule_results, 1, total_steps)
+
+            keys = [self._batch_key(batch) for batch in batches] if checkpoints else [None] * len(batches)
+            restored = {}
+            if checkpoints:
+                for number, key in enumerate(keys, start=1):
+                    saved = checkpoints.get(key)
+                    if saved is not None:
+                        restored[number] = saved
+                stats["checkpoint_restored"] = len(restored)
+                metrics.increment("checkpoint_restored", len(restored), document=original_filename)
+
+            # Context for every batch still to review is fetched up front with a single bulk embeddings
+            # request. Each clause is its own query, so boilerplate repeated across batches and
+            # documents is served from the retriever's LRU.
+            pending = [number for number in range(1, len(batches) + 1) if number not in restored]
+            with metrics.span("retrieval", document=original_filename):
+                retrieved = iter(self.batch_retriever.retrieve_many(
+                    [text for number in pending for _, text, _ in batches[number - 1]]))
+                contexts = {number: [next(retrieved) for _ in batches[number - 1]] for number in pending}
+
+            # The LLM calls run in parallel, but results are consumed in batch order, so issues and
+            # comments keep document order regardless of which call finishes first.
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                futures = []
+                for number, batch in enumerate(batches, start=1):
+                    if number in restored:
+                        future = Future()
+                        future.set_result((restored[number], len(batch)))
+                    else:
+                        future = executor.submit(self._review_batch, batch, contexts[number], metrics, original_filename, number)
+                    futures.append(future)
+                for number, (batch, key, future) in enumerate(zip(batches, keys, futures), start=1):
+                    results, hits = future.result()
+                    if number not in restored:
+                        stats["cache_hits"] += hits
+                        if checkpoints:
+                            checkpoints.put(key, results)
+                    stats["llm_calls"] += 1 if hits < len(batch) else 0
+                    by_clause = {}
+                    for result in results:
+                        if isinstance(result, dict):
+                            by_clause.setdefault(result.get("clause_number"), []).append(
+                                {k: v for k, v in result.items() if k != "clause_number"})
+                    for clause_number, _, _ in batch:
+                        if clause_number - 1 in representatives:
+                            fan_out.publish(representatives[clause_number - 1], by_clause.get(clause_number, []))
+                    # Clauses with a non-conclusive rule hit still go to the LLM; its version of that finding is dropped.
+                    emit(drop_restated(results, rule_issues_by_clause), number + 1, total_steps)
+
+            duplicate_results = []
+            for position, group in sorted(duplicates.items()):
+                duplicate_results.extend({**issue, "clause_number": position + 1} for issue in fan_out.result(group))
+            emit(drop_restated(duplicate_results, rule_issues_by_clause), total_steps, total_steps)
         finally:
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
+            # Never leave duplicates in other documents waiting on a representative that failed.
+            for group in representatives.values():
+                fan_out.publish(group, [])
 
-    def analyze_and_prepare_downloads(self, doc_urls, original_filenames):
-        if not doc_urls:
-            return {}, None
-        
-        final_report = self.check_missing_documents(original_filenames)
-        final_report["issues_found"] = []
-        
-        reviewed_doc_paths_for_download = []
-        
-        for i, url in enumerate(doc_urls):
-            original_name = original_filenames[i]
-            modified_doc, issues = self._analyze_single_document_from_url(url, original_name)
-            final_report["issues_found"].extend(issues)
-            
-            output_dir = tempfile.mkdtemp()
-            output_path = os.path.join(output_dir, f"REVIEWED_{original_name}")
-            save_document(modified_doc, output_path)
-            reviewed_doc_paths_for_download.append(output_path)
+        with metrics.span("add_comment", document=original_filename):
+            doc = self._write_comments(stream, pending_comments)
+        return doc, issues_found, stats
+
+    def iter_analysis(self, doc_sources, original_filenames, checkpoints=None):
+        """
+        Streaming variant of analyze_and_prepare_downloads. Yields event dicts as work completes:
+          {"type": "started", "report": <checklist report>}
+          {"type": "batch", "document": name, "issues": [...], "batches_done": n, "batches_total": m}
+          {"type": "done", "report": final_report, "download": zip_path}
+        `checkpoints`, if given, stores finished batches so an interrupted run can resume (see core.job_queue).
+        """
+        if not doc_sources:
+            yield {"type": "done", "report": {}, "download": None}
+            return
+
+        events = queue.Queue()
+        # Per-run metrics for the report; everything is also accumulated in the process-wide registry.
+        metrics = Metrics(parent=METRICS)
+        run_started = time.perf_counter()
+
+        zip_path = os.path.join(tempfile.mkdtemp(prefix="adgm_review_"), "REVIEWED_documents.zip")
+
+        # Documents are reviewed in parallel; every worker shares this agent's rate limiter,
+        # retriever and caches. Results are merged in upload order so the report is deterministic.
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel_documents, len(doc_sources))) as executor:
+            documents = list(executor.map(lambda source, name: self._extract_document(source, name, metrics),
+                                          doc_sources, original_filenames))
+
+            # Document types (and so the checklist) come from each document's opening text.
+            with metrics.span("classify"):
+                final_report = self.check_missing_documents(original_filenames, [opening for _, _, opening in documents])
+            final_report["issues_found"] = []
+            final_report["review_stats"] = []
+            # Consumers build their live report on this one; it must not share the lists filled in below.
+            yield {"type": "started", "report": copy.deepcopy(final_report)}
+
+            # Near-duplicates are grouped across the whole pack before any LLM work starts. A group's
+            # representative is always its earliest clause, so a document only ever waits on documents
+            # submitted before it and the pool cannot deadlock.
+            with metrics.span("dedup"):
+                representatives, duplicates = self._plan_duplicates(documents)
+            fan_out = FanOut()
+
+            def review(index, name):
+                def on_batch(issues, done, total):
+                    events.put({"type": "batch", "document": name, "issues": issues, "batches_done": done, "batches_total": total})
+                stream, clauses, _ = documents[index]
+                with metrics.span("document", document=name):
+                    return self._review_document(stream, clauses, name, on_batch, metrics,
+                                                 representatives[index], duplicates[index], fan_out, checkpoints)
+
+            futures = [executor.submit(review, index, name) for index, name in enumerate(original_filenames)]
+            while not all(future.done() for future in futures) or not events.empty():
+                try:
+                    yield events.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+            def reviewed_documents():
+                for original_name, future in zip(original_filenames, futures):
+                    modified_doc, issues, stats = future.result()
+                    final_report["issues_found"].extend(issues)
+                    final_report["review_stats"].append(stats)
+                    yield f"REVIEWED_{original_name}", modified_doc
+
+            save_documents_to_zip(reviewed_documents(), zip_path, metrics)
             
-        downloadable_file = reviewed_doc_paths_for_download[0] if reviewed_doc_paths_for_download else None
-        
-        return final_report, downloadable_file
\ No newline at end of file
+        metrics.record("run", time.perf_counter() - run_started)
+        final_report["review_cache"] = self.review_cache.stats()
+        final_report["retrieval"] = self.batch_retriever.stats()
+        final_report["metrics"] = metrics.summary()
+        final_report["context"] = self._context_report(metrics)
+        if self.prometheus_path:
+            try:
+                METRICS.write_prometheus(self.prometheus_path)
+            except OSError as e:
+                print(f"Could not write Prometheus metrics: {e}")
+        yield {"type": "done", "report": final_report, "download": zip_path}
+
+    @staticmethod
+    def _context_report(metrics):
+        """Run totals of the context assembly stage, from the per-run metrics counters."""
+        counters = metrics.counters
+        retrieved = counters.get("context_tokens_retrieved", 0)
+        sent = counters.get("context_tokens_sent", 0)
+        return {
+            "tokens_retrieved": retrieved,
+            "tokens_sent": sent,
+            "tokens_saved": retrieved - sent,
+            "saved_pct": round(100 * (retrieved - sent) / retrieved, 1) if retrieved else 0.0,
+            "chunks_merged": counters.get("context_chunks_merged", 0),
+            "duplicates_dropped": counters.get("context_duplicates_dropped", 0),
+            "passages_truncated": counters.get("context_passages_truncated", 0),
+        }
+
+    def analyze_and_prepare_downloads(self, doc_sources, original_filenames):
+        """`doc_sources` may mix URLs, local paths and in-memory bytes/file objects."""
+        for event in self.iter_analysis(doc_sources, original_filenames):
+            if event["type"] == "done":
+                return event["report"], event["download"]
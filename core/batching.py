@@ -0,0 +1,117 @@
+import math
+import os
+import re
+from core.rate_limiter import estimate_tokens
+
+# Total prompt size (template + retrieved context + clauses) a single LLM call may use.
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Paragraphs shorter than this are headings/labels and are not worth reviewing.
+MIN_CLAUSE_CHARS = 20
+# What the original fixed-size batching used; kept to report savings against.
+LEGACY_BATCH_SIZE = 2
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.;:!?])\s+")
+
+
+def format_clause(clause_number, text, part=None, parts=None):
+    """Renders one clause (or one part of a split clause) the way the prompt expects it."""
+    label = f"Clause {clause_number}"
+    if parts and parts > 1:
+        label += f" (part {part} of {parts})"
+    return f"{label}:\n\"\"\"\n{text}\n\"\"\""
+
+
+def join_batch(entries):
+    """Joins planned (clause_number, text, formatted_clause) entries into the prompt's clauses block."""
+    return "\n\n".join(entry[2] for entry in entries)
+
+
+def split_text(text, max_tokens):
+    """Splits text on sentence boundaries (falling back to words) into pieces of at most max_tokens."""
+    pieces, current = [], ""
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        if estimate_tokens(sentence) > max_tokens:
+            units = sentence.split(" ")
+        else:
+            units = [sentence]
+        for unit in units:
+            candidate = f"{current} {unit}" if current else unit
+            if estimate_tokens(candidate) <= max_tokens:
+                current = candidate
+                continue
+            if current:
+                pieces.append(current)
+            # A single word longer than the budget is cut on characters as a last resort.
+            while estimate_tokens(unit) > max_tokens:
+                pieces.append(unit[:max_tokens * 4])
+                unit = unit[max_tokens * 4:]
+            current = unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def context_reservation(clauses, context_tokens, context_tokens_per_clause=0):
+    """
+    Context tokens reserved for a prompt of `clauses` clauses: a fixed `context_tokens`, or, with a
+    per-clause allowance, that allowance for every clause up to a cap of `context_tokens`.
+    """
+    if not context_tokens_per_clause:
+        return context_tokens
+    return min(context_tokens, clauses * context_tokens_per_clause)
+
+
+def plan_batches(clauses, template_tokens, context_tokens, budget=DEFAULT_PROMPT_TOKEN_BUDGET,
+                 context_tokens_per_clause=0):
+    """
+    Packs clauses into as few prompts as fit the token budget.
+
+    `clauses` is a list of (clause_number, text). Returns a list of batches, each a list of
+    (clause_number, text, formatted_clause) entries, plus a report comparing the plan against
+    fixed batches of two. Oversized clauses are split into parts that keep their clause number.
+    With `context_tokens_per_clause`, every entry reserves that much context and `context_tokens`
+    caps the total, so a batch holds no more entries than the cap leaves each its full allowance.
+    """
+    def reserved(entries):
+        return context_reservation(entries, context_tokens, context_tokens_per_clause)
+
+    max_entries = max(1, context_tokens // context_tokens_per_clause) if context_tokens_per_clause else None
+    # Always leave room for at least a modest clause, even if the context alone blows the budget.
+    prompt_limit = max(budget, template_tokens + reserved(1) + 256)
+    clause_budget = prompt_limit - template_tokens - reserved(1)
+
+    entries = []
+    for clause_number, text in clauses:
+        formatted = format_clause(clause_number, text)
+        if estimate_tokens(formatted) <= clause_budget:
+            entries.append((clause_number, text, formatted))
+            continue
+        # Reserve room for the "Clause N (part i of n)" wrapper around every piece.
+        pieces = split_text(text, clause_budget - 32)
+        for part, piece in enumerate(pieces, start=1):
+            entries.append((clause_number, piece, format_clause(clause_number, piece, part, len(pieces))))
+
+    batches, current, current_tokens = [], [], 0
+    for entry in entries:
+        entry_tokens = estimate_tokens(entry[2]) + 1
+        prompt_tokens = template_tokens + reserved(len(current) + 1) + current_tokens + entry_tokens
+        if current and (len(current) == max_entries or prompt_tokens > prompt_limit):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(entry)
+        current_tokens += entry_tokens
+    if current:
+        batches.append(current)
+
+    clause_tokens = sum(estimate_tokens(format_clause(n, t)) for n, t in clauses)
+    legacy_calls = math.ceil(len(clauses) / LEGACY_BATCH_SIZE)
+    planned_tokens = sum(template_tokens + reserved(len(batch)) + estimate_tokens(join_batch(batch)) for batch in batches)
+    legacy_tokens = legacy_calls * (template_tokens + reserved(LEGACY_BATCH_SIZE)) + clause_tokens
+    report = {
+        "clauses": len(clauses),
+        "llm_calls": len(batches),
+        "llm_calls_saved": legacy_calls - len(batches),
+        "prompt_tokens": planned_tokens,
+        "prompt_tokens_saved": legacy_tokens - planned_tokens,
+    }
+    return batches, report
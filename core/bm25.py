@@ -0,0 +1,61 @@
+import math
+import re
+from collections import Counter
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Function words carry no signal for regulation lookups and only lengthen the postings scanned per query.
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "shall may any such which who whom been being not no".split()
+)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 over a fixed list of texts. Postings are stored per term as numpy
+    arrays of (document, term frequency), so scoring a query only touches the documents that
+    contain its terms.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.size = len(texts)
+        postings = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                tfs.append(tf)
+        self.postings = {
+            term: (np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in self.postings.items()
+        }
+        average_length = float(lengths.mean()) if self.size else 0.0
+        # The length normalisation part of the denominator depends only on the document, so it is precomputed.
+        self.length_norm = k1 * (1 - b + b * lengths / (average_length or 1.0))
+
+    def search(self, query, k):
+        """Returns up to `k` (document index, score) pairs with a positive score, best first."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term, query_tf in Counter(tokenize(query)).items():
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            scores[docs] += query_tf * self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.length_norm[docs])
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in ranked]
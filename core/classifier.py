@@ -0,0 +1,94 @@
+import re
+
+# Roughly the first few pages of a document; titles and recitals are where the type is stated.
+CLASSIFY_CHARS = 8000
+TITLE_CHARS = 500
+# Minimum score for a content-based match; below it the filename heuristic is used instead.
+MIN_SCORE = 5
+
+_FULL_NAME_WEIGHT = 5
+_KEYWORD_WEIGHT = 1
+# The first line is usually the document's own title; later title-area mentions are often references to other documents.
+_HEADING_MULTIPLIER = 10
+_TITLE_MULTIPLIER = 3
+# Added for each type the filename points to: enough to settle close calls, not to outvote the heading.
+_FILENAME_WEIGHT = 5
+
+
+class DocTypeClassifier:
+    """
+    Scores document types from content in a single pass. Every document-type keyword and every
+    checklist document name is compiled into one alternation regex, so a document's opening text
+    is scanned once regardless of how many types are known.
+    """
+
+    def __init__(self, doc_type_keywords, checklists):
+        self.doc_type_keywords = doc_type_keywords
+        self.weights = {}
+        for doc_type, keywords in doc_type_keywords.items():
+            for keyword in keywords:
+                self.weights.setdefault(keyword.lower(), []).append((doc_type, _KEYWORD_WEIGHT))
+        for checklist in checklists.values():
+            for doc_type in checklist["docs"]:
+                self.weights.setdefault(doc_type.lower(), []).append((doc_type, _FULL_NAME_WEIGHT))
+        # Longest first, so "articles of association" wins over "articles" at the same position.
+        phrases = sorted(self.weights, key=len, reverse=True)
+        # A trailing "s" is allowed so plural headings ("RESOLUTIONS OF THE BOARD") still match.
+        self.pattern = re.compile(r"\b(" + "|".join(re.escape(p) for p in phrases) + r")s?\b")
+
+    def filename_types(self, filename):
+        """Document types whose keywords appear in the filename, in checklist order."""
+        filename_lower = filename.lower()
+        return [
+            doc_type for doc_type, keywords in self.doc_type_keywords.items()
+            if any(keyword in filename_lower for keyword in keywords)
+        ]
+
+    def identify_from_filename(self, filename):
+        matches = self.filename_types(filename)
+        return matches[0] if matches else "Unknown Document"
+
+    def score(self, text):
+        """Returns {doc_type: score} for the opening CLASSIFY_CHARS of `text`."""
+        # Each phrase counts once (boosted if it appears in the heading or title area), so generic
+        # words like "members" or "directors" repeated throughout a document can't outvote its title.
+        text = text[:CLASSIFY_CHARS].lower()
+        stripped = text.lstrip()
+        heading_end = len(text) - len(stripped) + (stripped.find("\n") if "\n" in stripped else len(stripped))
+        multipliers = {}
+        for match in self.pattern.finditer(text):
+            if match.start() < heading_end:
+                multiplier = _HEADING_MULTIPLIER
+            elif match.start() < TITLE_CHARS:
+                multiplier = _TITLE_MULTIPLIER
+            else:
+                multiplier = 1
+            phrase = match.group(1)
+            multipliers[phrase] = max(multipliers.get(phrase, 0), multiplier)
+        scores = {}
+        for phrase, multiplier in multipliers.items():
+            for doc_type, weight in self.weights[phrase]:
+                scores[doc_type] = scores.get(doc_type, 0) + weight * multiplier
+        return scores
+
+    def classify(self, filename, text=None):
+        """
+        Classifies by content when there is a confident match, otherwise by filename. The filename
+        also counts as extra evidence for the types it names, and breaks ties between content scores.
+        Returns {"doc_type", "score", "method", "candidates"} with the top-scoring candidates.
+        """
+        content_scores = self.score(text) if text else {}
+        from_filename = self.filename_types(filename)
+        scores = dict(content_scores)
+        if scores:
+            for doc_type in from_filename:
+                scores[doc_type] = scores.get(doc_type, 0) + _FILENAME_WEIGHT
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (item[1], item[0] in from_filename, content_scores.get(item[0], 0)),
+            reverse=True,
+        )
+        candidates = dict(ranked[:3])
+        if ranked and content_scores.get(ranked[0][0], 0) >= MIN_SCORE:
+            return {"doc_type": ranked[0][0], "score": ranked[0][1], "method": "content", "candidates": candidates}
+        return {"doc_type": self.identify_from_filename(filename), "score": 0, "method": "filename", "candidates": candidates}
@@ -0,0 +1,177 @@
+import math
+import os
+from collections import Counter
+from core.batching import split_text
+from core.bm25 import tokenize
+from core.dedup import word_shingles
+from core.rate_limiter import estimate_tokens
+
+# Regulation context allowed per clause in a prompt, so a batch's context grows with its clause count.
+CONTEXT_TOKENS_PER_CLAUSE = int(os.getenv("CONTEXT_TOKENS_PER_CLAUSE", "250"))
+# Hard cap on the regulation context sent with each prompt; the batch planner packs no more clauses
+# into one prompt than leaves each its full per-clause allowance under this cap.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+# Passages whose word shingles are at least this much contained in a better-ranked passage are dropped.
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+# MMR trade-off: 1.0 ranks purely by relevance to the clauses, lower values favour diverse passages.
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# A passage cut to fit the budget must keep at least this much text to be worth including.
+MIN_TRUNCATED_TOKENS = 50
+# Splitter overlap is a suffix of one chunk repeated as the prefix of the next; shorter matches are coincidence.
+MIN_OVERLAP_CHARS = 20
+
+
+def _link_candidates(passages, members):
+    """
+    Finds, within one source's passages, which passages contain others and which overlap the
+    start of another. Each passage's first MIN_OVERLAP_CHARS characters are indexed, so one scan
+    of every passage finds all its partners. Returns (contained pairs, (left, right, overlap) links).
+    """
+    prefixes = {}
+    for i in members:
+        text = passages[i][0]
+        if len(text) >= MIN_OVERLAP_CHARS:
+            prefixes.setdefault(text[:MIN_OVERLAP_CHARS], []).append(i)
+    contained, links = [], []
+    for i in members:
+        left = passages[i][0]
+        for start in range(len(left) - MIN_OVERLAP_CHARS + 1):
+            for j in prefixes.get(left[start:start + MIN_OVERLAP_CHARS], ()):
+                if j == i:
+                    continue
+                right = passages[j][0]
+                if left.startswith(right, start):
+                    # Of two identical passages, the better-ranked one is kept.
+                    if len(right) < len(left) or j > i:
+                        contained.append((i, j))
+                elif right.startswith(left[start:]):
+                    links.append((i, j, len(left) - start))
+        # Passages too short to index are only ever merged by containment.
+        contained.extend(
+            (i, j) for j in members
+            if j != i and len(passages[j][0]) < MIN_OVERLAP_CHARS and passages[j][0] in left
+            and (len(passages[j][0]) < len(left) or j > i)
+        )
+    return contained, links
+
+
+def merge_overlapping(passages):
+    """
+    Joins passages from the same source whose ends overlap (adjacent splitter chunks) into one,
+    and folds passages contained in another into it. `passages` are (text, source) pairs in rank
+    order; a merged passage takes its best rank.
+    """
+    passages = list(passages)
+    by_source = {}
+    for i, (_, source) in enumerate(passages):
+        by_source.setdefault(source, []).append(i)
+
+    container, successor, predecessor = {}, {}, {}
+    for members in by_source.values():
+        contained, links = _link_candidates(passages, members)
+        for i, j in sorted(contained, key=lambda pair: (-len(passages[pair[0]][0]), pair)):
+            if j not in container and i not in container:
+                container[j] = i
+        # Best-ranked passages link first, each to the partner it overlaps most.
+        for i, j, length in sorted(links, key=lambda link: (link[0], -link[2], link[1])):
+            if i in container or j in container or i in successor or j in predecessor:
+                continue
+            end = j
+            while end in successor:
+                end = successor[end][0]
+            if end == i:
+                continue
+            successor[i], predecessor[j] = (j, length), i
+
+    merged = []
+    for head in range(len(passages)):
+        if head in container or head in predecessor:
+            continue
+        text, members = passages[head][0], [head]
+        current = head
+        while current in successor:
+            current, length = successor[current]
+            text += passages[current][0][length:]
+            members.append(current)
+        rank = min(members)
+        merged.append((rank, text, passages[head][1], members))
+
+    # A folded passage lends its rank to the passage (or chain) that absorbed it.
+    chain_of = {member: rank for rank, _, _, members in merged for member in members}
+    best = {rank: rank for rank in chain_of.values()}
+    for j in container:
+        root = j
+        while root in container:
+            root = container[root]
+        best[chain_of[root]] = min(best[chain_of[root]], j)
+    merged.sort(key=lambda item: best[item[0]])
+    return [(text, source) for _, text, source, _ in merged], len(container) + len(successor)
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _containment(a, b):
+    """Share of `a`'s shingles that also occur in `b`; unlike Jaccard, catches a passage repeated inside a longer one."""
+    return len(a & b) / len(a) if a else 0.0
+
+
+def _cosine(a, b):
+    dot = sum(count * b.get(term, 0) for term, count in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def assemble_context(docs, query, budget=CONTEXT_TOKEN_BUDGET, duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD,
+                     mmr_lambda=MMR_LAMBDA):
+    """
+    Builds the prompt's {context} from retrieved chunks: overlapping chunks are merged,
+    near-duplicates dropped, and the rest picked by maximal marginal relevance to `query`
+    (the batch's clauses) until `budget` tokens are used. Returns (context, report).
+    """
+    original = "\n".join(d.page_content for d in docs)
+    passages, merged = merge_overlapping((d.page_content, d.metadata.get("source")) for d in docs)
+
+    shingles, kept, duplicates = [], [], 0
+    for text, _ in passages:
+        text_shingles = word_shingles(text)
+        if any(_containment(text_shingles, other) >= duplicate_threshold for other in shingles):
+            duplicates += 1
+            continue
+        shingles.append(text_shingles)
+        kept.append(text)
+
+    query_terms = Counter(tokenize(query))
+    relevance = [_cosine(Counter(tokenize(text)), query_terms) for text in kept]
+    selected, used, truncated = [], 0, 0
+    remaining = list(range(len(kept)))
+    while remaining and used < budget:
+        def mmr(i):
+            redundancy = max((_jaccard(shingles[i], shingles[j]) for j in selected), default=0.0)
+            return mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+        best = max(remaining, key=lambda i: (mmr(i), -i))
+        remaining.remove(best)
+        tokens = estimate_tokens(kept[best])
+        if used + tokens > budget:
+            room = budget - used
+            # The best passage is always included, cut to size if need be.
+            if room < MIN_TRUNCATED_TOKENS and selected:
+                break
+            kept[best] = split_text(kept[best], room)[0]
+            tokens = estimate_tokens(kept[best])
+            truncated += 1
+        selected.append(best)
+        used += tokens
+
+    context = "\n".join(kept[i] for i in selected)
+    report = {
+        "chunks_retrieved": len(docs),
+        "chunks_merged": merged,
+        "duplicates_dropped": duplicates,
+        "passages_sent": len(selected),
+        "passages_truncated": truncated,
+        "tokens_retrieved": estimate_tokens(original) if original else 0,
+        "tokens_sent": estimate_tokens(context) if context else 0,
+    }
+    return context, report
@@ -0,0 +1,85 @@
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import Future
+import numpy as np
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+SHINGLE_WORDS = 3
+NUM_PERMUTATIONS = 64
+BANDS = 16
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; p is the first prime above 2**32,
+# so a * x stays below 2**64 and the arithmetic fits in uint64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 2 ** 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def word_shingles(text):
+    """Overlapping SHINGLE_WORDS-word sequences of `text`, lowercased (the whole text if shorter)."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i+SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signatures(texts):
+    """One MinHash signature (row) per text."""
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in word_shingles(text)), dtype=np.uint64)
+        signatures[row] = ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+    return signatures
+
+
+def group_near_duplicates(texts, threshold=DEDUP_THRESHOLD):
+    """
+    Groups texts whose estimated Jaccard similarity (over word shingles) is at least `threshold`.
+    Returns, for every text, the index of its group's representative: the earliest member.
+    A text only joins a group whose representative it is similar to, so A≈B and B≈C do not
+    chain A and C together when they are not near-duplicates themselves.
+    """
+    representatives = list(range(len(texts)))
+    if len(texts) < 2:
+        return representatives
+    signatures = minhash_signatures(texts)
+    rows = NUM_PERMUTATIONS // BANDS
+    # LSH banding over representatives only: a text is compared with those it agrees with on a whole band.
+    buckets = [{} for _ in range(BANDS)]
+    for i in range(len(texts)):
+        keys = [bytes(signatures[i, band * rows:(band + 1) * rows]) for band in range(BANDS)]
+        candidates = sorted({r for band, key in enumerate(keys) for r in buckets[band].get(key, ())})
+        for candidate in candidates:
+            if np.mean(signatures[candidate] == signatures[i]) >= threshold:
+                representatives[i] = candidate
+                break
+        else:
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(i)
+    return representatives
+
+
+class FanOut:
+    """Hands a representative clause's review result to its near-duplicates, which may live in other documents."""
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _future(self, group):
+        with self._lock:
+            return self._futures.setdefault(group, Future())
+
+    def publish(self, group, issues):
+        """Records the representative's issues; later calls for the same group are ignored."""
+        future = self._future(group)
+        with self._lock:
+            if not future.done():
+                future.set_result(issues)
+
+    def result(self, group):
+        """Blocks until the group's representative has been reviewed."""
+        return self._future(group).result()
@@ -0,0 +1,71 @@
+import io
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+_session = None
+
+
+def get_session():
+    """One pooled HTTP session shared by every remote download in the process."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+class DocumentSource:
+    """Where a .docx comes from. `open()` returns something python-docx's Document() accepts."""
+
+    def open(self):
+        raise NotImplementedError
+
+
+class LocalFileSource(DocumentSource):
+    def __init__(self, path):
+        self.path = path
+
+    def open(self):
+        return self.path
+
+
+class BytesSource(DocumentSource):
+    """In-memory upload: raw bytes or any binary file-like object (BytesIO, Streamlit UploadedFile...)."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def open(self):
+        if isinstance(self.data, (bytes, bytearray)):
+            return io.BytesIO(self.data)
+        self.data.seek(0)
+        return self.data
+
+
+class URLSource(DocumentSource):
+    def __init__(self, url, session=None, timeout=30):
+        self.url = url
+        self.session = session
+        self.timeout = timeout
+
+    def open(self):
+        response = (self.session or get_session()).get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return io.BytesIO(response.content)
+
+
+def as_document_source(source):
+    """Wraps a URL, local path, bytes or file-like object in the matching DocumentSource."""
+    if isinstance(source, DocumentSource):
+        return source
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, "read"):
+        return BytesSource(source)
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        return URLSource(source)
+    if isinstance(source, (str, os.PathLike)):
+        return LocalFileSource(source)
+    raise TypeError(f"Unsupported document source: {type(source).__name__}")
@@ -1,11 +1,36 @@
 from docx import Document
+from docx.oxml.ns import qn
+from docx.text.run import Run
 import os
+import zipfile
+from core.metrics import METRICS
+
+def _paragraph_runs(paragraph):
+    """
+    Every run whose text belongs to the paragraph, including runs nested in hyperlinks, content
+    controls and tracked insertions (paragraph.runs only returns direct children).
+    """
+    p = paragraph._p
+    return [
+        Run(r, paragraph) for r in p.iter(qn("w:r"))
+        if next(r.iterancestors(qn("w:p")), None) is p
+    ]
 
 def add_comment(paragraph, comment_text, author="Corporate Agent"):
-    """Adds a comment to a paragraph in a .docx file."""
-    comment = paragraph.add_comment(comment_text, author=author)
+    """
+    Adds a comment to a paragraph in a .docx file. Returns None, leaving the paragraph
+    untouched, when it has no runs to anchor the comment on.
+    """
+    runs = _paragraph_runs(paragraph)
+    if not runs:
+        return None
+    if hasattr(paragraph, "add_comment"):
+        comment = paragraph.add_comment(comment_text, author=author)
+    else:
+        # python-docx >= 1.2 anchors comments on runs through the document instead.
+        comment = paragraph.part.document.add_comment(runs, text=comment_text, author=author)
 
-    for run in paragraph.runs:
+    for run in runs:
         run.font.highlight_color = 7 
     return comment
 
@@ -14,4 +39,26 @@ def save_document(doc, output_path):
     output_dir = os.path.dirname(output_path)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    doc.save(output_path)
\ No newline at end of file
+    doc.save(output_path)
+
+def save_documents_to_zip(named_docs, zip_path, metrics=METRICS):
+    """
+    Writes (filename, document) pairs into a single ZIP archive. Each document is streamed
+    straight into its archive entry as soon as it is yielded, without an intermediate file.
+    """
+    output_dir = os.path.dirname(zip_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    used_names = set()
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for filename, doc in named_docs:
+            name, counter = filename, 1
+            while name in used_names:
+                counter += 1
+                base, ext = os.path.splitext(filename)
+                name = f"{base}_{counter}{ext}"
+            used_names.add(name)
+            # A .docx is already deflate-compressed, so the entry itself is simply stored.
+            with metrics.span("save_document", document=filename), archive.open(name, "w") as entry:
+                doc.save(entry)
+    return zip_path
\ No newline at end of file
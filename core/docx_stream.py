@@ -0,0 +1,120 @@
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from docx import Document
+from docx.text.paragraph import Paragraph
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_P = f"{{{W_NS}}}p"
+_T = f"{{{W_NS}}}t"
+_TAB = f"{{{W_NS}}}tab"
+_BR = f"{{{W_NS}}}br"
+_TC = f"{{{W_NS}}}tc"
+
+BODY_PART = "word/document.xml"
+
+
+def _header_footer_parts(archive):
+    names = [name for name in archive.namelist() if name.startswith(("word/header", "word/footer")) and name.endswith(".xml")]
+    return sorted(names)
+
+
+def _iter_part_paragraphs(xml_stream, part_name):
+    """
+    Iterparses one WordprocessingML part, yielding a dict per non-empty paragraph. Paragraphs are
+    numbered in document (pre-)order, the same order lxml's element.iter() visits them, so the
+    index can be used to find the paragraph again at write-back time.
+    """
+    index = -1
+    open_indices = []
+    cell_depth = 0
+    for event, elem in ET.iterparse(xml_stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == _P:
+                index += 1
+                open_indices.append(index)
+            elif elem.tag == _TC:
+                cell_depth += 1
+            continue
+
+        if elem.tag == _TC:
+            cell_depth -= 1
+        elif elem.tag == _P:
+            paragraph_index = open_indices.pop()
+            pieces = []
+            for node in elem.iter():
+                if node.tag == _T and node.text:
+                    pieces.append(node.text)
+                elif node.tag == _TAB:
+                    pieces.append("\t")
+                elif node.tag == _BR:
+                    pieces.append("\n")
+            text = "".join(pieces)
+            if text.strip():
+                yield {
+                    "part": part_name,
+                    "index": paragraph_index,
+                    "text": text,
+                    "in_table": cell_depth > 0,
+                }
+            # Dropping the paragraph's children keeps memory proportional to one paragraph.
+            # (Nested paragraphs, e.g. in text boxes, end first and so are not counted twice.)
+            elem.clear()
+
+
+def iter_clauses(source, include_headers=True):
+    """
+    Streams clause candidates out of a .docx (path or binary stream) without building the
+    python-docx object model. Covers body paragraphs, table cells, content controls, numbered
+    list items and, optionally, headers and footers.
+    """
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(BODY_PART) as xml_stream:
+            yield from _iter_part_paragraphs(xml_stream, BODY_PART)
+        if include_headers:
+            for part_name in _header_footer_parts(archive):
+                with archive.open(part_name) as xml_stream:
+                    yield from _iter_part_paragraphs(xml_stream, part_name)
+
+
+class UnmodifiedDocx:
+    """Stands in for a python-docx Document when nothing needs annotating: save() copies the original bytes."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def save(self, target):
+        if hasattr(self.source, "read"):
+            self.source.seek(0)
+            data = self.source
+        else:
+            data = open(self.source, "rb")
+        try:
+            if hasattr(target, "write"):
+                shutil.copyfileobj(data, target)
+            else:
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(data, f)
+        finally:
+            if data is not self.source:
+                data.close()
+
+
+def open_for_annotation(source):
+    """Opens the full python-docx Document; only done once a document actually has issues."""
+    if hasattr(source, "read"):
+        source.seek(0)
+    return Document(source)
+
+
+def find_body_paragraphs(doc, indices):
+    """Maps body paragraph indices (as numbered by iter_clauses) to python-docx Paragraphs."""
+    wanted = set(indices)
+    found = {}
+    body = doc.element.body
+    for index, element in enumerate(body.iter(_P)):
+        if index in wanted:
+            found[index] = Paragraph(element, doc._body)
+            if len(found) == len(wanted):
+                break
+    return found
@@ -0,0 +1,62 @@
+import array
+import os
+import sqlite3
+import threading
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")
+
+
+class EmbeddingCache:
+    """
+    Persistent chunk-hash -> vector store, so a chunk is only ever embedded once per model,
+    no matter how many times the index is rebuilt or which source it came from.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, chunk_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model, chunk_hashes):
+        """Returns {chunk_hash: vector} for the hashes that are cached."""
+        found = {}
+        hashes = list(set(chunk_hashes))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i+500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = array.array("f", blob).tolist()
+        return found
+
+    def set_many(self, model, vectors):
+        """Stores {chunk_hash: vector}."""
+        rows = [(model, chunk_hash, array.array("f", vector).tobytes()) for chunk_hash, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def embed(self, embeddings, texts_by_hash):
+        """Embeds only the chunks missing from the cache; returns {chunk_hash: vector} for all of them."""
+        model = getattr(embeddings, "model", type(embeddings).__name__)
+        vectors = self.get_many(model, texts_by_hash.keys())
+        missing = [h for h in texts_by_hash if h not in vectors]
+        if missing:
+            print(f"Embedding {len(missing)} new chunk(s) ({len(vectors)} served from cache)...")
+            new_vectors = dict(zip(missing, embeddings.embed_documents([texts_by_hash[h] for h in missing])))
+            self.set_many(model, new_vectors)
+            vectors.update(new_vectors)
+        return vectors
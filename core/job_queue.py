@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite")
+MAX_ATTEMPTS = 3
+
+
+class JobQueue:
+    """
+    Local SQLite-backed queue of documents to review. Safe to share between processes on one
+    host: each process opens its own connection, and jobs are claimed inside an IMMEDIATE
+    transaction so two workers never take the same job. Completed clause batches are stored
+    as checkpoints, so a job interrupted part-way resumes without repeating finished batches.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # Autocommit mode; a worker's review threads share its connection behind the lock.
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL UNIQUE, status TEXT NOT NULL DEFAULT 'queued', "
+            "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, error TEXT, output_path TEXT, report TEXT, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "job_id INTEGER NOT NULL, batch_key TEXT NOT NULL, results TEXT NOT NULL, PRIMARY KEY (job_id, batch_key))"
+        )
+
+    def _execute(self, sql, params=(), fetch=None):
+        """Runs one statement under the lock; `fetch` is "one" or "all" to return rows, else the cursor."""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            if fetch == "one":
+                return cursor.fetchone()
+            if fetch == "all":
+                return cursor.fetchall()
+            return cursor
+
+    def close(self):
+        self._conn.close()
+
+    def enqueue(self, paths):
+        """Adds documents that aren't queued yet; returns how many were new."""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (path, updated_at) VALUES (?, ?)",
+                [(os.path.abspath(path), time.time()) for path in paths],
+            )
+            return self._conn.total_changes - before
+
+    def requeue_interrupted(self):
+        """Puts jobs left 'running' by a crashed or killed run back in the queue."""
+        return self._execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? WHERE status = 'running'", (time.time(),)
+        ).rowcount
+
+    def claim(self, worker):
+        """Atomically takes the next queued job, or returns None when the queue is empty."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT id, path FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker, time.time(), row[0]),
+                )
+                return {"id": row[0], "path": row[1]}
+            finally:
+                self._conn.execute("COMMIT")
+
+    def complete(self, job_id, output_path, report):
+        self._execute(
+            "UPDATE jobs SET status = 'done', error = NULL, output_path = ?, report = ?, updated_at = ? WHERE id = ?",
+            (output_path, json.dumps(report), time.time(), job_id),
+        )
+        # Checkpoints have served their purpose once the job's output is written.
+        self._execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id, error, max_attempts=MAX_ATTEMPTS):
+        """Records the error and requeues the job unless it has used up its attempts."""
+        self._execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "error = ?, worker = NULL, updated_at = ? WHERE id = ?",
+            (max_attempts, error, time.time(), job_id),
+        )
+
+    def counts(self):
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status", fetch="all"))
+
+    def jobs(self):
+        rows = self._execute(
+            "SELECT id, path, status, attempts, error, output_path, report FROM jobs ORDER BY id", fetch="all"
+        )
+        return [
+            {"id": r[0], "path": r[1], "status": r[2], "attempts": r[3], "error": r[4], "output_path": r[5],
+             "report": json.loads(r[6]) if r[6] else None}
+            for r in rows
+        ]
+
+    def checkpoints(self, job_id):
+        return JobCheckpoints(self, job_id)
+
+
+class JobCheckpoints:
+    """Per-job view of stored batch results, passed to ADGMCorporateAgent.iter_analysis."""
+
+    def __init__(self, job_queue, job_id):
+        self.job_queue = job_queue
+        self.job_id = job_id
+
+    def get(self, batch_key):
+        row = self.job_queue._execute(
+            "SELECT results FROM checkpoints WHERE job_id = ? AND batch_key = ?", (self.job_id, batch_key), fetch="one"
+        )
+        return json.loads(row[0]) if row else None
+
+    def put(self, batch_key, results):
+        self.job_queue._execute(
+            "INSERT OR REPLACE INTO checkpoints (job_id, batch_key, results) VALUES (?, ?, ?)",
+            (self.job_id, batch_key, json.dumps(results)),
+        )
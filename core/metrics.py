@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", "data/metrics.prom")
+
+
+class Metrics:
+    """
+    Lightweight stage timings and counters. A span or counter recorded on a Metrics with a
+    parent is also recorded on the parent, so a per-run instance can feed the process-wide
+    registry that is exported in Prometheus text format.
+    """
+
+    def __init__(self, parent=None, enabled=METRICS_ENABLED):
+        self.parent = parent
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.documents = {}
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, document=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            agg = self.stages.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            agg["count"] += 1
+            agg["total_s"] += seconds
+            agg["max_s"] = max(agg["max_s"], seconds)
+            if document is not None:
+                doc_stages = self.documents.setdefault(document, {}).setdefault("stages_s", {})
+                doc_stages[stage] = doc_stages.get(stage, 0.0) + seconds
+        if self.parent:
+            self.parent.record(stage, seconds)
+
+    @contextmanager
+    def span(self, stage, document=None):
+        """Times the enclosed block as `stage` (and against `document`, if given)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, document)
+
+    def increment(self, name, value=1, document=None):
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if document is not None:
+                doc_counters = self.documents.setdefault(document, {}).setdefault("counters", {})
+                doc_counters[name] = doc_counters.get(name, 0) + value
+        if self.parent:
+            self.parent.increment(name, value)
+
+    def record_batch(self, **fields):
+        """Keeps one row per reviewed batch (only on this instance, not the parent)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.batches.append(fields)
+
+    def summary(self):
+        """JSON-serialisable snapshot, suitable for embedding in final_report."""
+        with self._lock:
+            stages = {
+                stage: {**agg, "total_s": round(agg["total_s"], 4), "max_s": round(agg["max_s"], 4),
+                        "mean_s": round(agg["total_s"] / agg["count"], 4)}
+                for stage, agg in self.stages.items()
+            }
+            documents = {
+                name: {**data, "stages_s": {k: round(v, 4) for k, v in data.get("stages_s", {}).items()}}
+                for name, data in self.documents.items()
+            }
+            return {"stages": stages, "counters": dict(self.counters), "documents": documents, "batches": list(self.batches)}
+
+    def to_prometheus(self, prefix="adgm"):
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        with self._lock:
+            for stage, agg in sorted(self.stages.items()):
+                lines.append(f'{prefix}_stage_seconds_total{{stage="{stage}"}} {agg["total_s"]:.6f}')
+                lines.append(f'{prefix}_stage_calls_total{{stage="{stage}"}} {agg["count"]}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_PROMETHEUS_PATH):
+        """Writes the metrics atomically, e.g. for node_exporter's textfile collector."""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+
+# Process-wide registry; per-run Metrics instances use it as their parent.
+METRICS = Metrics()
+
+
+def start_metrics_server(port, metrics=METRICS):
+    """Serves `metrics` in Prometheus text format on http://0.0.0.0:<port>/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
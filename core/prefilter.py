@@ -0,0 +1,67 @@
+import re
+
+# Each rule: (pattern, issue, severity, suggestion, restatement pattern). Issues use the same schema as
+# the LLM output, minus clause_number, which the caller fills in. The restatement pattern recognises
+# an LLM issue describing the same finding in its own words.
+_JURISDICTION_RESTATED = r"\bcourts?\b|jurisdiction"
+_RULES = [
+    (r"\b(?:UAE|U\.A\.E\.?|United Arab Emirates)\s+Federal\s+Courts?\b|\bFederal\s+Courts?\s+of\s+the\s+(?:UAE|United Arab Emirates)\b",
+     "Refers disputes to the UAE Federal Courts instead of the ADGM Courts.", "High",
+     "Replace the reference with the Courts of the Abu Dhabi Global Market (ADGM Courts).",
+     _JURISDICTION_RESTATED),
+    (r"\bDubai\s+Courts?\b|\bCourts?\s+of\s+Dubai\b",
+     "Refers disputes to the Dubai Courts instead of the ADGM Courts.", "High",
+     "Replace the reference with the Courts of the Abu Dhabi Global Market (ADGM Courts).",
+     _JURISDICTION_RESTATED),
+    (r"\bDIFC\s+Courts?\b|\bCourts?\s+of\s+the\s+Dubai\s+International\s+Financial\s+Cent(?:re|er)\b",
+     "Refers disputes to the DIFC Courts instead of the ADGM Courts.", "High",
+     "Replace the reference with the Courts of the Abu Dhabi Global Market (ADGM Courts).",
+     _JURISDICTION_RESTATED),
+    (r"\bAbu\s+Dhabi\s+(?:Judicial\s+Department|Courts?)\b|\bCourts?\s+of\s+(?:the\s+Emirate\s+of\s+)?Abu\s+Dhabi\b(?!\s+Global\s+Market)",
+     "Refers disputes to the onshore Abu Dhabi courts instead of the ADGM Courts.", "High",
+     "Replace the reference with the Courts of the Abu Dhabi Global Market (ADGM Courts).",
+     _JURISDICTION_RESTATED),
+    (r"\[\s*[●•]\s*\]|\[\s*_+\s*\]|\[\s*(?:insert|tbc|tbd)\b[^\]]*\]",
+     "Contains a blank placeholder that has not been completed.", "Medium",
+     "Fill in the placeholder with the required information before filing.",
+     r"placeholder|\bblank\b|\[\s*[●•_]|not (?:been )?(?:completed|filled)"),
+    (r"\bCompanies\s+Regulations\s+2015\b",
+     "Cites the ADGM Companies Regulations 2015, which have been replaced.", "Medium",
+     "Refer to the ADGM Companies Regulations 2020.",
+     r"\b2015\b|superseded|outdated|repealed|replaced"),
+]
+RULES = [(re.compile(pattern, re.IGNORECASE), issue, severity, suggestion) for pattern, issue, severity, suggestion, _ in _RULES]
+# One combined pattern lets clauses without any red flag (the vast majority) be rejected in a single scan.
+_ANY_RULE = re.compile("|".join(f"(?:{pattern})" for pattern, *_ in _RULES), re.IGNORECASE)
+# Recognises the LLM restating a rule's finding in its own words, keyed by the rule's issue text.
+_RESTATED = {issue: re.compile(restated, re.IGNORECASE) for _, issue, _, _, restated in _RULES}
+
+
+def apply_rules(text):
+    """Returns the rule-based issues for one clause (empty for most clauses)."""
+    if not _ANY_RULE.search(text):
+        return []
+    return [
+        {"issue": issue, "severity": severity, "suggestion": suggestion}
+        for pattern, issue, severity, suggestion in RULES
+        if pattern.search(text)
+    ]
+
+
+def is_conclusive(issues):
+    """A High-severity rule hit means the clause must be redrafted anyway, so the LLM can skip it."""
+    return any(issue["severity"] == "High" for issue in issues)
+
+
+def drop_restated(results, rule_issues_by_clause):
+    """
+    Removes LLM issues that restate a rule hit on the same clause (the rule's wording is kept),
+    so a clause flagged by a non-conclusive rule doesn't get the same finding reported twice.
+    """
+    kept = []
+    for result in results:
+        rule_issues = rule_issues_by_clause.get(result.get("clause_number")) if isinstance(result, dict) else None
+        if rule_issues and any(_RESTATED[rule["issue"]].search(str(result.get("issue", ""))) for rule in rule_issues):
+            continue
+        kept.append(result)
+    return kept
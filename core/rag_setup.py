@@ -1,11 +1,12 @@
 import os
-import requests
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader, Docx2txtLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings 
-from langchain_community.vectorstores import FAISS
+import json
+import hashlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from core.embedding_cache import EmbeddingCache
+from core.metrics import METRICS
+from core.source_fetcher import fetch_sources
 
 load_dotenv()
 
@@ -19,73 +20,331 @@ ADGM_DATA_SOURCES = {
 
 SOURCE_DOCS_DIR = "data/adgm_sources"
 VECTOR_STORE_PATH = "faiss_index"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+MANIFEST_FILENAME = "manifest.json"
+# Map the saved index read-only instead of copying it onto the heap, so every process shares its pages.
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "1") != "0"
+# "flat" searches the exact index; "ivfpq" searches an IVF-PQ compressed copy built from it, which keeps
+# memory and latency roughly flat as the corpus grows at some cost in recall (tune with FAISS_NPROBE).
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+# 0 picks a value from the corpus size (nlist) or the embedding width (PQ sub-quantizers).
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))
+COMPRESSED_INDEX_FILENAME = "index_ivfpq.faiss"
+# faiss wants ~39 training points per centroid, and each PQ sub-quantizer has 2**nbits centroids.
+# Codebooks use 8 bits when the corpus can train them and fewer (down to 4) for smaller corpora;
+# below 39 * 2**4 vectors the flat index is used.
+_TRAINING_POINTS_PER_CENTROID = 39
+MAX_PQ_BITS = 8
+MIN_PQ_BITS = 4
+MIN_COMPRESSED_VECTORS = _TRAINING_POINTS_PER_CENTROID * 2 ** MIN_PQ_BITS
+# Worker processes for parsing changed PDF sources; 1 parses them in-process.
+PDF_SPLIT_WORKERS = int(os.getenv("PDF_SPLIT_WORKERS", str(min(4, os.cpu_count() or 1))))
 
-def download_and_prepare_sources():
-    if not os.path.exists(SOURCE_DOCS_DIR):
-        os.makedirs(SOURCE_DOCS_DIR)
-    for filename, url in ADGM_DATA_SOURCES.items():
-        output_path = os.path.join(SOURCE_DOCS_DIR, filename)
-        if not os.path.exists(output_path):
-            print(f"Downloading {filename}...")
+# Loader classes from langchain_community.document_loaders, imported only when a source needs splitting.
+# Downloaded HTML pages are stored as extracted plain text, hence the TextLoader.
+LOADERS = {
+    ".docx": ("Docx2txtLoader", {}),
+    ".pdf": ("PyPDFLoader", {}),
+    ".html": ("TextLoader", {"encoding": "utf-8"}),
+}
+
+def download_and_prepare_sources(sources=ADGM_DATA_SOURCES, source_dir=SOURCE_DOCS_DIR):
+    """
+    Fetches the sources concurrently with conditional GETs, so a refresh only re-downloads
+    what the server reports as changed (see core.source_fetcher).
+    """
+    counts = fetch_sources(sources, source_dir)
+    print(f"Sources: {counts['downloaded']} downloaded, {counts['unchanged']} unchanged, {counts['failed']} failed.")
+    return counts
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunk_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _load_manifest(vector_store_path):
+    manifest_path = os.path.join(vector_store_path, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def _save_manifest(manifest, vector_store_path):
+    with open(os.path.join(vector_store_path, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _split_source(path, text_splitter=None):
+    """Loads one source file and splits it into chunks, each with a stable ID."""
+    from langchain_community import document_loaders
+    if text_splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    loader_name, loader_kwargs = LOADERS[os.path.splitext(path)[1].lower()]
+    loader_cls = getattr(document_loaders, loader_name)
+    chunks = text_splitter.split_documents(loader_cls(path, **loader_kwargs).load())
+    # IDs are content-derived (plus an occurrence counter for repeated boilerplate), so an
+    # edit elsewhere in the file leaves the IDs of untouched chunks unchanged.
+    seen = {}
+    ids = []
+    for chunk in chunks:
+        chunk_hash = _chunk_hash(chunk.page_content)
+        seen[chunk_hash] = seen.get(chunk_hash, 0) + 1
+        ids.append(f"{os.path.basename(path)}:{chunk_hash}:{seen[chunk_hash]}")
+    return chunks, ids
+
+
+def _split_sources(paths, max_workers=PDF_SPLIT_WORKERS):
+    """
+    Splits the given source files, returning {path: (chunks, ids) or the exception raised}.
+    PDF parsing is CPU-bound and dominates a cold build, so two or more PDFs are split in
+    parallel worker processes; text sources are cheap and split in-process.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    pdfs = [path for path in paths if path.lower().endswith(".pdf")]
+    if len(pdfs) < 2 or max_workers < 2:
+        pdfs = []
+    results = {}
+    if pdfs:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(pdfs))) as executor:
+            futures = {path: executor.submit(_split_source, path) for path in pdfs}
+            for path, future in futures.items():
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    results[path] = e
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for path in paths:
+        if path not in results:
             try:
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()
-                if ".html" in filename:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    text = soup.get_text(separator='\n', strip=True)
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(text)
-                else:
-                    with open(output_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-            except requests.RequestException as e:
-                print(f"Error downloading {url}: {e}")
-
-def create_rag_pipeline():
-    if os.path.exists(VECTOR_STORE_PATH):
-        print("Loading existing vector store...")
+                results[path] = _split_source(path, text_splitter)
+            except Exception as e:
+                results[path] = e
+    return results
+
+
+def _ivfpq_params(ntotal, dimensions, nlist=FAISS_NLIST, m=FAISS_PQ_M):
+    """
+    Defaults to ~4*sqrt(n) lists and the widest PQ split of the vector, with codebooks as wide
+    (up to 8 bits) as the corpus has training points for.
+    """
+    nlist = nlist or max(1, min(ntotal // _TRAINING_POINTS_PER_CENTROID, int(4 * ntotal ** 0.5)))
+    m = m or next(c for c in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dimensions % c == 0)
+    nbits = max(MIN_PQ_BITS, min(MAX_PQ_BITS, (ntotal // _TRAINING_POINTS_PER_CENTROID).bit_length() - 1))
+    return nlist, m, nbits
+
 
+def build_compressed_index(flat_index, nlist=FAISS_NLIST, m=FAISS_PQ_M):
+    """
+    Trains an IVF-PQ index on the vectors of `flat_index` and adds them in the same order, so
+    positions (and therefore the docstore mapping) carry over unchanged.
+    """
+    import faiss
+    nlist, m, nbits = _ivfpq_params(flat_index.ntotal, flat_index.d, nlist, m)
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    index = faiss.index_factory(flat_index.d, f"IVF{nlist},PQ{m}x{nbits}", flat_index.metric_type)
+    # index_factory turns on polysemous training, which dominates build time and is only used by
+    # polysemous (Hamming-filtered) search, not by plain IVF-PQ search.
+    faiss.downcast_index(index).do_polysemous_training = False
+    index.train(vectors)
+    index.add(vectors)
+    return index, {"nlist": nlist, "m": m, "nbits": nbits, "ntotal": flat_index.ntotal}
+
+
+def _save_compressed_index(flat_index, vector_store_path, manifest):
+    """Rebuilds the IVF-PQ copy of the flat index and records its parameters in the manifest."""
+    import faiss
+    if flat_index.ntotal < MIN_COMPRESSED_VECTORS:
+        print(f"Only {flat_index.ntotal} vectors; too few to train IVF-PQ, using the flat index.")
+        manifest.pop("compressed_index", None)
+        return
+    print("Building IVF-PQ compressed index...")
+    index, params = build_compressed_index(flat_index)
+    path = os.path.join(vector_store_path, COMPRESSED_INDEX_FILENAME)
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    manifest["compressed_index"] = params
+
+
+def _compressed_index_is_current(manifest, vector_store_path):
+    params = manifest.get("compressed_index")
+    if not params or not os.path.exists(os.path.join(vector_store_path, COMPRESSED_INDEX_FILENAME)):
+        return False
+    requested = (FAISS_NLIST or params["nlist"], FAISS_PQ_M or params["m"])
+    return requested == (params["nlist"], params["m"])
+
+
+def load_vector_store(vector_store_path, embeddings, mmap=VECTOR_STORE_MMAP, index_type="flat", nprobe=FAISS_NPROBE):
+    """
+    Loads a saved FAISS store. With `mmap`, the index file is memory-mapped read-only, so
+    processes loading the same index share one copy of it in the page cache; such a store
+    can be searched but not modified. `index_type="ivfpq"` searches the compressed copy
+    (see build_compressed_index) with `nprobe` lists probed per query.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    if index_type == "ivfpq":
+        # IO_FLAG_MMAP maps the IVF inverted lists, which hold the PQ codes.
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(os.path.join(vector_store_path, COMPRESSED_INDEX_FILENAME), flags)
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    elif not mmap:
+        return FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+    else:
+        # IO_FLAG_MMAP_IFC maps flat indexes; older faiss releases only support IO_FLAG_MMAP,
+        # which maps IVF inverted lists.
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        index = faiss.read_index(os.path.join(vector_store_path, "index.faiss"), flags)
+    # Same file FAISS.save_local wrote; only ever loaded from our own index directory.
+    with open(os.path.join(vector_store_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def _save_vector_store(vector_store, vector_store_path):
+    """
+    Saves next to the live index and renames into place. Other processes may have the old
+    index.faiss memory-mapped; a rename leaves their mapping intact where truncating it wouldn't.
+    """
+    staging_path = f"{vector_store_path}.tmp"
+    vector_store.save_local(staging_path)
+    os.makedirs(vector_store_path, exist_ok=True)
+    for name in os.listdir(staging_path):
+        os.replace(os.path.join(staging_path, name), os.path.join(vector_store_path, name))
+    os.rmdir(staging_path)
+
+
+def _open_for_search(vector_store_path, embeddings, mmap, index_type, nprobe, manifest):
+    # Falls back to the flat index when the corpus was too small to compress.
+    if index_type == "ivfpq" and "compressed_index" not in manifest:
+        index_type = "flat"
+    return load_vector_store(vector_store_path, embeddings, mmap, index_type, nprobe)
+
+
+def create_rag_pipeline(embeddings=None, source_dir=SOURCE_DOCS_DIR, vector_store_path=VECTOR_STORE_PATH,
+                        embedding_cache=None, download=True, mmap=VECTOR_STORE_MMAP, index_type=FAISS_INDEX_TYPE,
+                        nprobe=FAISS_NPROBE):
+    """
+    Loads the vector store and brings it up to date with the source directory.
+    A manifest records the hash of every source file and the IDs of its chunks, so only
+    new or changed sources are re-split, and only their new chunks are embedded and indexed.
+    The keyword arguments exist so the pipeline can be pointed at another corpus or
+    embedding model (e.g. the offline benchmark's fakes). With `mmap`, the returned
+    retriever searches a read-only memory-mapped index (see load_vector_store). The flat
+    index is always kept; with `index_type="ivfpq"` a compressed copy is rebuilt from it
+    whenever it changes, and that copy is what gets searched.
+    """
+    if index_type not in ("flat", "ivfpq"):
+        raise ValueError(f"Unknown FAISS index type: {index_type!r} (expected 'flat' or 'ivfpq')")
+    if download:
+        with METRICS.span("rag_download_sources"):
+            download_and_prepare_sources()
+    if embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
         embeddings = OpenAIEmbeddings()
+    embedding_model = getattr(embeddings, "model", type(embeddings).__name__)
+
+    manifest = _load_manifest(vector_store_path)
+    index_exists = bool(manifest) and manifest.get("embedding_model") == embedding_model and os.path.exists(vector_store_path)
+    if not index_exists:
+        # An index without a manifest (or built with another model) can't be updated in place.
+        manifest = None
+    manifest = manifest or {"embedding_model": embedding_model, "sources": {}}
 
-        return FAISS.load_local(VECTOR_STORE_PATH, embeddings, allow_dangerous_deserialization=True).as_retriever()
-    
-    print("Building new vector store...")
-    download_and_prepare_sources()
-    all_docs = []
-    
-    loaders_config = {
-        "**/*.docx": {"loader_cls": Docx2txtLoader},
-        "**/*.pdf": {"loader_cls": PyPDFLoader},
-        "**/*.html": {"loader_cls": TextLoader, "loader_kwargs": {"encoding": "utf-8"}}
-    }
-    
-    for glob_pattern, config in loaders_config.items():
-        try:
-            loader = DirectoryLoader(
-                SOURCE_DOCS_DIR, 
-                glob=glob_pattern, 
-                loader_cls=config["loader_cls"],
-                loader_kwargs=config.get("loader_kwargs"),
-                show_progress=True, 
-                use_multithreading=True
-            )
-            docs = loader.load()
-            all_docs.extend(docs)
-            print(f"Loaded {len(docs)} document(s) for pattern {glob_pattern}.")
-        except Exception as e:
-            print(f"Could not load files for pattern {glob_pattern}. Error: {e}")
-
-    if not all_docs:
+    source_files = sorted(
+        name for name in os.listdir(source_dir)
+        if os.path.splitext(name)[1].lower() in LOADERS
+    )
+    changed = {}
+    for name in source_files:
+        path = os.path.join(source_dir, name)
+        file_hash = _file_hash(path)
+        previous = manifest["sources"].get(name)
+        if not previous or previous["hash"] != file_hash:
+            changed[name] = (path, file_hash, previous)
+
+    ids_to_remove = []
+    new_chunks = {}
+    if changed:
+        with METRICS.span("rag_load_and_split"):
+            split = _split_sources([path for path, _, _ in changed.values()])
+    for name, (path, file_hash, previous) in changed.items():
+        if isinstance(split[path], Exception):
+            print(f"Could not load {name}. Error: {split[path]}")
+            continue
+        chunks, ids = split[path]
+        print(f"Source {'changed' if previous else 'added'}: {name} ({len(chunks)} chunks)")
+        old_ids = set(previous["chunk_ids"]) if previous else set()
+        ids_to_remove.extend(old_ids - set(ids))
+        new_chunks.update({chunk_id: chunk for chunk_id, chunk in zip(ids, chunks) if chunk_id not in old_ids})
+        manifest["sources"][name] = {"hash": file_hash, "chunk_ids": ids}
+
+    for name in set(manifest["sources"]) - set(source_files):
+        print(f"Source removed: {name}")
+        ids_to_remove.extend(manifest["sources"].pop(name)["chunk_ids"])
+
+    if not index_exists and not new_chunks:
         raise ValueError("No documents were loaded from the source directory.")
+    # Sources are checked against the manifest before the index is read, so an up-to-date index
+    # can go straight to the (possibly memory-mapped) read-only load.
+    if not new_chunks and not ids_to_remove:
+        if index_type == "ivfpq" and not _compressed_index_is_current(manifest, vector_store_path):
+            with METRICS.span("rag_compress_index"):
+                flat_store = load_vector_store(vector_store_path, embeddings, mmap=False)
+                _save_compressed_index(flat_store.index, vector_store_path, manifest)
+                _save_manifest(manifest, vector_store_path)
+        print("Loading existing vector store...")
+        with METRICS.span("rag_load_index"):
+            return _open_for_search(vector_store_path, embeddings, mmap, index_type, nprobe, manifest).as_retriever()
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-    docs = text_splitter.split_documents(all_docs)
-    
+    vector_store = None
+    if index_exists:
+        print("Loading existing vector store for update...")
+        with METRICS.span("rag_load_index"):
+            vector_store = load_vector_store(vector_store_path, embeddings, mmap=False)
 
-    embeddings = OpenAIEmbeddings()
+    if new_chunks:
+        chunk_ids = list(new_chunks)
+        hashes = {chunk_id: _chunk_hash(new_chunks[chunk_id].page_content) for chunk_id in chunk_ids}
+        with METRICS.span("rag_embed"):
+            vectors = (embedding_cache or EmbeddingCache()).embed(embeddings, {hashes[c]: new_chunks[c].page_content for c in chunk_ids})
+        text_embeddings = [(new_chunks[c].page_content, vectors[hashes[c]]) for c in chunk_ids]
+        metadatas = [new_chunks[c].metadata for c in chunk_ids]
+        with METRICS.span("rag_index_update"):
+            if vector_store is None:
+                print("Building new vector store...")
+                from langchain_community.vectorstores import FAISS
+                vector_store = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=chunk_ids)
+            else:
+                vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=chunk_ids)
+    if ids_to_remove:
+        with METRICS.span("rag_index_update"):
+            vector_store.delete(ids_to_remove)
 
-    vector_store = FAISS.from_documents(docs, embeddings)
-    vector_store.save_local(VECTOR_STORE_PATH)
-    print("Vector store created and saved.")
-    return vector_store.as_retriever()
\ No newline at end of file
+    with METRICS.span("rag_save_index"):
+        _save_vector_store(vector_store, vector_store_path)
+    # A compressed copy of the previous index no longer matches the docstore.
+    manifest.pop("compressed_index", None)
+    if index_type == "ivfpq":
+        with METRICS.span("rag_compress_index"):
+            _save_compressed_index(vector_store.index, vector_store_path, manifest)
+    _save_manifest(manifest, vector_store_path)
+    METRICS.increment("rag_chunks_added", len(new_chunks))
+    METRICS.increment("rag_chunks_removed", len(ids_to_remove))
+    print(f"Vector store updated: {len(new_chunks)} chunk(s) added, {len(ids_to_remove)} removed.")
+    if mmap or "compressed_index" in manifest:
+        # Swap the freshly built heap copy for the shared mapping (or the compressed copy) of what was just saved.
+        with METRICS.span("rag_load_index"):
+            vector_store = _open_for_search(vector_store_path, embeddings, mmap, index_type, nprobe, manifest)
+    return vector_store.as_retriever()
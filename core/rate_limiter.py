@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+import time
+
+# Defaults roughly match an OpenAI tier-1 quota for gpt-4o; override them in .env.
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for OpenAI models)."""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(error):
+    """Returns True if the exception looks like an HTTP 429 from the LLM provider."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A classic token bucket that refills continuously at a fixed rate."""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self.updated_at
+        self.available = min(self.capacity, self.available + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def seconds_until(self, amount):
+        """How long until `amount` tokens are available (0 if they already are)."""
+        missing = min(amount, self.capacity) - self.available
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second
+
+    def consume(self, amount):
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter driven by requests-per-minute and tokens-per-minute quotas.
+    A single instance can be shared by every worker that talks to the same API key.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries=6, base_delay=2.0, max_delay=60.0, max_concurrency=None):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+        self.retries = 0
+        self._lock = threading.Lock()
+        # Optional cap on calls in flight through this limiter, e.g. a batch worker's share of the key's concurrency.
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def acquire(self, tokens=1):
+        """Blocks until one request and `tokens` tokens fit inside the quota."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(self.paused_until - now, self.requests.seconds_until(1), self.tokens.seconds_until(tokens))
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(tokens)
+                    return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stops every caller from sending for `seconds` (used after a 429)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def call(self, fn, tokens=1, on_retry=None):
+        """
+        Runs `fn()` inside the quota, retrying with exponential backoff on 429s.
+        `on_retry(delay)` is called before each retry, e.g. to count retries per call.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                if self._slots is None:
+                    return fn()
+                with self._slots:
+                    return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = _retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempt)) * (0.5 + random.random() / 2)
+                with self._lock:
+                    self.retries += 1
+                if on_retry:
+                    on_retry(delay)
+                print(f"Rate limited by the LLM provider, retrying in {delay:.1f}s...")
+                self.pause(delay)
+                attempt += 1
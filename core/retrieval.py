@@ -0,0 +1,172 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from core.bm25 import BM25Index
+from core.review_cache import chunk_id, normalize_clause
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+# "hybrid" fuses BM25 keyword scores with vector scores; "vector" is similarity search alone.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Weight of the vector score in the fused score (the BM25 score gets 1 - HYBRID_ALPHA).
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+# Each ranker contributes k * HYBRID_CANDIDATES candidates to the fusion.
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+
+
+def _min_max(scores):
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {key: 1.0 for key in scores}
+    return {key: (value - low) / (high - low) for key, value in scores.items()}
+
+
+def fuse_scores(vector_scores, keyword_scores, alpha, k):
+    """
+    Convex combination of min-max normalised scores ({position: score}, higher is better).
+    A candidate missing from one ranker scores 0 there. Returns the top `k` positions.
+    """
+    vector_scores = _min_max(vector_scores) if vector_scores else {}
+    keyword_scores = _min_max(keyword_scores) if keyword_scores else {}
+    fused = {
+        position: alpha * vector_scores.get(position, 0.0) + (1 - alpha) * keyword_scores.get(position, 0.0)
+        for position in set(vector_scores) | set(keyword_scores)
+    }
+    return sorted(fused, key=lambda position: (-fused[position], position))[:k]
+
+
+def merge_results(doc_lists):
+    """
+    Interleaves several queries' retrieved chunks into one list by rank (every query's best
+    chunk first, then every second-best, ...), keeping the first occurrence of each chunk.
+    """
+    merged, seen = [], set()
+    for rank in range(max((len(docs) for docs in doc_lists), default=0)):
+        for docs in doc_lists:
+            if rank < len(docs) and chunk_id(docs[rank]) not in seen:
+                seen.add(chunk_id(docs[rank]))
+                merged.append(docs[rank])
+    return merged
+
+
+class BatchRetriever:
+    """
+    Retrieves context for many queries at once: one bulk embeddings request, one batched
+    FAISS search over the resulting matrix, and an in-memory LRU of query -> chunks so
+    repeated boilerplate (within or across documents) skips both steps. In hybrid mode the
+    vector candidates are fused with BM25 candidates from an inverted index over the same
+    chunks, which is built on first use.
+    """
+
+    def __init__(self, retriever, cache_size=RETRIEVAL_CACHE_SIZE, mode=RETRIEVAL_MODE, alpha=HYBRID_ALPHA,
+                 candidates=HYBRID_CANDIDATES):
+        if mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {mode!r} (expected 'vector' or 'hybrid')")
+        self.retriever = retriever
+        self.mode = mode
+        self.alpha = alpha
+        self.candidates = max(1, candidates)
+        self._bm25 = None
+        self._bm25_positions = None
+        self.vector_store = getattr(retriever, "vectorstore", None)
+        self.search_kwargs = getattr(retriever, "search_kwargs", {}) or {}
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.embedding_calls = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _can_search_directly(self):
+        # Only plain similarity search over a FAISS store can be batched; anything else
+        # (MMR, score thresholds, non-FAISS retrievers) goes through the retriever itself.
+        return (
+            self.vector_store is not None
+            and hasattr(self.vector_store, "index")
+            and hasattr(self.vector_store, "_embed_documents")
+            and getattr(self.retriever, "search_type", "similarity") == "similarity"
+            and set(self.search_kwargs) <= {"k"}
+        )
+
+    def _keyword_index(self):
+        """Builds the BM25 index over the vector store's chunks once, keyed by index position."""
+        with self._lock:
+            if self._bm25 is None:
+                store = self.vector_store
+                positions, texts = [], []
+                for position, docstore_id in store.index_to_docstore_id.items():
+                    doc = store.docstore.search(docstore_id)
+                    if not isinstance(doc, str):
+                        positions.append(position)
+                        texts.append(doc.page_content)
+                self._bm25_positions = positions
+                self._bm25 = BM25Index(texts)
+            return self._bm25, self._bm25_positions
+
+    def _search(self, queries):
+        if not self._can_search_directly():
+            return [self.retriever.get_relevant_documents(q) for q in queries]
+
+        store = self.vector_store
+        k = self.search_kwargs.get("k", 4)
+        fetch_k = k * self.candidates if self.mode == "hybrid" else k
+        matrix = np.array(store._embed_documents(queries), dtype=np.float32)
+        with self._lock:
+            self.embedding_calls += 1
+        if getattr(store, "_normalize_L2", False):
+            import faiss
+            faiss.normalize_L2(matrix)
+        distances, indices = store.index.search(matrix, fetch_k)
+
+        if self.mode == "hybrid":
+            import faiss
+            bm25, bm25_positions = self._keyword_index()
+            # Smaller is closer for L2 and larger for inner product; either way higher must mean better.
+            sign = -1.0 if store.index.metric_type == faiss.METRIC_L2 else 1.0
+            rankings = []
+            for query, row, row_distances in zip(queries, indices, distances):
+                vector_scores = {int(i): sign * float(d) for i, d in zip(row, row_distances) if i != -1}
+                keyword_scores = {bm25_positions[doc]: score for doc, score in bm25.search(query, fetch_k)}
+                rankings.append(fuse_scores(vector_scores, keyword_scores, self.alpha, k))
+        else:
+            rankings = [[int(i) for i in row if i != -1] for row in indices]
+
+        results = []
+        for ranking in rankings:
+            docs = []
+            for i in ranking:
+                doc = store.docstore.search(store.index_to_docstore_id[i])
+                if not isinstance(doc, str):
+                    docs.append(doc)
+            results.append(docs)
+        return results
+
+    def retrieve_many(self, queries):
+        """Returns a list of retrieved documents for each query, in the same order."""
+        keys = [normalize_clause(q) for q in queries]
+        results = [None] * len(queries)
+        pending = OrderedDict()
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                    self.hits += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        if pending:
+            first_queries = [queries[positions[0]] for positions in pending.values()]
+            for key, docs in zip(pending, self._search(first_queries)):
+                for i in pending[key]:
+                    results[i] = docs
+                with self._lock:
+                    self._cache[key] = docs
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return results
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "embedding_calls": self.embedding_calls}
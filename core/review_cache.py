@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+REVIEW_CACHE_PATH = os.getenv("REVIEW_CACHE_PATH", "data/review_cache.sqlite")
+REVIEW_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "100000"))
+REVIEW_CACHE_MAX_AGE_DAYS = float(os.getenv("REVIEW_CACHE_MAX_AGE_DAYS", "90"))
+
+# Eviction is cheap but not free, so it only runs every this many writes.
+_EVICT_EVERY = 200
+# A hit only rewrites accessed_at when the stored value is older than this; LRU order at
+# hour granularity is plenty for eviction and keeps cache hits read-only.
+_ACCESS_REFRESH_SECONDS = 3600
+# Keeps IN (...) lists under SQLite's bound-parameter limit.
+_QUERY_CHUNK = 500
+
+
+def normalize_clause(text):
+    """Collapses whitespace so re-flowed or re-indented clauses still hit the cache."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def chunk_id(document):
+    """Stable ID for a retrieved chunk: its vector-store ID if it has one, otherwise a content hash."""
+    doc_id = getattr(document, "id", None)
+    if doc_id:
+        return str(doc_id)
+    return hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()[:16]
+
+
+class ReviewCache:
+    """
+    Disk-backed (SQLite) cache of LLM review results, one entry per clause.
+    Entries are content-addressed, so an unchanged clause reviewed against the same
+    context, prompt and model is never sent to the LLM twice.
+    """
+
+    def __init__(self, path=REVIEW_CACHE_PATH, max_entries=REVIEW_CACHE_MAX_ENTRIES, max_age_days=REVIEW_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # Batch-mode worker processes share the file, so wait on another writer's lock rather than fail.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL lets readers in other processes proceed while one of them writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            "key TEXT PRIMARY KEY, issues TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS reviews_accessed_at ON reviews (accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(clause_text, chunk_ids, prompt_version, model_name):
+        payload = json.dumps([normalize_clause(clause_text), sorted(chunk_ids), prompt_version, model_name])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached issue list for `key`, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Returns {key: issue list} for the keys that hit, in one read and at most one write."""
+        now = time.time()
+        found, stale = {}, []
+        with self._lock:
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, issues, created_at, accessed_at FROM reviews WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, issues, created_at, accessed_at in rows:
+                    if now - created_at > self.max_age_seconds:
+                        continue
+                    found[key] = json.loads(issues)
+                    if now - accessed_at > _ACCESS_REFRESH_SECONDS:
+                        stale.append((now, key))
+            if stale:
+                self._conn.executemany("UPDATE reviews SET accessed_at = ? WHERE key = ?", stale)
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def set(self, key, issues):
+        self.set_many({key: issues})
+
+    def set_many(self, entries):
+        """Stores {key: issue list} in a single transaction."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reviews (key, issues, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(issues), now, now) for key, issues in entries.items()],
+            )
+            self._conn.commit()
+            should_evict = self._writes // _EVICT_EVERY != (self._writes + len(entries)) // _EVICT_EVERY
+            self._writes += len(entries)
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Drops entries older than the age limit, then the least recently used ones above the size limit."""
+        with self._lock:
+            self._conn.execute("DELETE FROM reviews WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            self._conn.execute(
+                "DELETE FROM reviews WHERE key IN (SELECT key FROM reviews ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -0,0 +1,160 @@
+import codecs
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+import requests
+from core.document_sources import get_session
+from core.metrics import METRICS
+
+SOURCE_DOWNLOAD_WORKERS = int(os.getenv("SOURCE_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_MANIFEST_FILENAME = "download_manifest.json"
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text, fed one chunk at a time so a page is never held in memory whole.
+    Output matches BeautifulSoup's get_text(separator="\\n", strip=True): every text node is
+    stripped and written on its own line, and script/style/template contents are skipped.
+    """
+
+    _SKIPPED = {"script", "style", "template"}
+
+    def __init__(self, out):
+        super().__init__(convert_charrefs=True)
+        self.out = out
+        self._pieces = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        text = "".join(self._pieces).strip()
+        self._pieces = []
+        if text:
+            self.out.write(text + "\n")
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self._SKIPPED:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self._SKIPPED and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        # A text node can arrive in several calls when it spans chunk boundaries.
+        if not self._skip_depth:
+            self._pieces.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _response_encoding(response):
+    # requests assumes ISO-8859-1 for any text/* response without a charset; real pages are UTF-8.
+    if "charset" in response.headers.get("content-type", "").lower():
+        return response.encoding
+    return "utf-8"
+
+
+def _write_html_text(response, path):
+    decoder = codecs.getincrementaldecoder(_response_encoding(response))(errors="replace")
+    with open(path, "w", encoding="utf-8") as f:
+        extractor = StreamingTextExtractor(f)
+        for chunk in response.iter_content(chunk_size=_STREAM_CHUNK_BYTES):
+            extractor.feed(decoder.decode(chunk))
+        extractor.feed(decoder.decode(b"", final=True))
+        extractor.close()
+
+
+def _write_binary(response, path):
+    with open(path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=_STREAM_CHUNK_BYTES):
+            f.write(chunk)
+
+
+def load_download_manifest(source_dir):
+    path = os.path.join(source_dir, DOWNLOAD_MANIFEST_FILENAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _save_download_manifest(manifest, source_dir):
+    path = os.path.join(source_dir, DOWNLOAD_MANIFEST_FILENAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def fetch_source(session, filename, url, source_dir, previous=None, timeout=30):
+    """
+    Downloads one source unless the server says it is unchanged. The ETag/Last-Modified
+    validators from the previous download are sent as a conditional GET, so an unchanged
+    source costs one 304 round trip. HTML is stored as extracted text. Returns
+    (status, manifest entry), with status "downloaded", "unchanged" or "failed".
+    """
+    output_path = os.path.join(source_dir, filename)
+    partial_path = f"{output_path}.part"
+    headers = {}
+    if previous and previous.get("url") == url and os.path.exists(output_path):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304:
+                return "unchanged", previous
+            response.raise_for_status()
+            print(f"Downloading {filename}...")
+            # Written next to the target and renamed, so a failed download never leaves a truncated source.
+            if ".html" in filename:
+                _write_html_text(response, partial_path)
+            else:
+                _write_binary(response, partial_path)
+            os.replace(partial_path, output_path)
+            return "downloaded", {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+    except (requests.RequestException, OSError) as e:
+        print(f"Error downloading {url}: {e}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return "failed", previous
+
+
+def fetch_sources(sources, source_dir, session=None, max_workers=SOURCE_DOWNLOAD_WORKERS, metrics=METRICS):
+    """
+    Fetches every {filename: url} in `sources` concurrently over one pooled session, recording
+    validators in the source directory's download manifest. Returns counts per status.
+    """
+    os.makedirs(source_dir, exist_ok=True)
+    session = session or get_session()
+    manifest = load_download_manifest(source_dir)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources) or 1))) as executor:
+        futures = {
+            filename: executor.submit(fetch_source, session, filename, url, source_dir, manifest.get(filename))
+            for filename, url in sources.items()
+        }
+        counts = {"downloaded": 0, "unchanged": 0, "failed": 0}
+        for filename, future in futures.items():
+            status, entry = future.result()
+            counts[status] += 1
+            if entry:
+                manifest[filename] = entry
+    _save_download_manifest(manifest, source_dir)
+    for status, count in counts.items():
+        metrics.increment(f"sources_{status}", count)
+    return counts
@@ -0,0 +1,80 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "data/uploads")
+CLOUDINARY_KEYS = ["CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"]
+
+# Archival never blocks a review, so uploads happen on a small background pool.
+_archive_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="archive")
+
+
+class LocalStorage:
+    """Stores uploaded documents on the local filesystem; a drop-in for CloudinaryStorage."""
+
+    def __init__(self, root=LOCAL_STORAGE_DIR):
+        self.root = root
+
+    def upload(self, file, name):
+        """`file` is a path, bytes or a binary file-like object. Returns the stored file's path."""
+        output_path = os.path.join(self.root, name)
+        output_dir = os.path.dirname(output_path)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        if isinstance(file, (bytes, bytearray)):
+            with open(output_path, "wb") as f:
+                f.write(file)
+        elif hasattr(file, "read"):
+            file.seek(0)
+            with open(output_path, "wb") as f:
+                shutil.copyfileobj(file, f)
+        else:
+            shutil.copyfile(file, output_path)
+        return output_path
+
+
+class CloudinaryStorage:
+    def __init__(self):
+        import cloudinary
+        cloudinary.config(
+            cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key = os.getenv("CLOUDINARY_API_KEY"),
+            api_secret = os.getenv("CLOUDINARY_API_SECRET"),
+            secure = True
+        )
+
+    def upload(self, file, name):
+        """Uploads a path, bytes or file-like object as a raw asset. Returns its secure URL."""
+        import cloudinary.uploader
+        public_id = f"adgm_docs/{name}"
+        upload_result = cloudinary.uploader.upload(file, resource_type="raw", public_id=public_id, overwrite=True)
+        secure_url = upload_result.get('secure_url')
+        if not secure_url:
+            raise RuntimeError(f"Failed to upload {name}. Please check Cloudinary credentials.")
+        return secure_url
+
+
+def get_storage():
+    """Cloudinary when its credentials are configured, otherwise local filesystem storage."""
+    backend = os.getenv("STORAGE_BACKEND", "").lower()
+    if backend == "local":
+        return LocalStorage()
+    if backend == "cloudinary" or all(os.getenv(key) for key in CLOUDINARY_KEYS):
+        return CloudinaryStorage()
+    return LocalStorage()
+
+
+def archive_in_background(storage, file, name):
+    """Schedules an upload for archival; failures are logged, never raised into the review."""
+    # File-like uploads are snapshotted now, since the caller may close them before the upload runs.
+    if hasattr(file, "read"):
+        file.seek(0)
+        file = file.read()
+
+    def _upload():
+        try:
+            return storage.upload(file, name)
+        except Exception as e:
+            print(f"Archiving {name} failed: {e}")
+
+    return _archive_executor.submit(_upload)
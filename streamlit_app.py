@@ -2,41 +2,41 @@ import streamlit as st
 import os
 import traceback
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
-import time
 
 # --- INITIALIZATION ---
-# Load core components AFTER environment is verified
-from core.rag_setup import create_rag_pipeline
-from core.agent import ADGMCorporateAgent
+# LangChain, FAISS and the vector index are imported/loaded lazily in initialize_agent,
+# so the page renders before they are needed.
+from core.storage import get_storage, archive_in_background
+from core.metrics import start_metrics_server
 
 st.set_page_config(page_title="ADGM Corporate Agent", page_icon="🤖")
 
 @st.cache_resource
-def initialize_agent():
-    """Initializes the agent and RAG pipeline, cached for performance."""
-    print("Initializing the Corporate Agent for Streamlit...")
+def initialize_services():
+    """Checks the environment and starts the cheap services, once per process."""
     load_dotenv()
 
-    # --- API Key Configuration Change Here ---
-    # We now check for OPENAI_API_KEY instead of GOOGLE_API_KEY
-    if not all(os.getenv(key) for key in ["CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET", "OPENAI_API_KEY"]):
-        st.error("CRITICAL ERROR: One or more required API keys are missing. Please configure them in your secrets.")
+    # Cloudinary is optional now (uploads are only archived), so only the OpenAI key is required.
+    if not os.getenv("OPENAI_API_KEY"):
+        st.error("CRITICAL ERROR: OPENAI_API_KEY is missing. Please configure it in your secrets.")
         st.stop()
-    # --- End of Change ---
 
-    cloudinary.config(
-        cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
-        api_key = os.getenv("CLOUDINARY_API_KEY"),
-        api_secret = os.getenv("CLOUDINARY_API_SECRET"),
-        secure = True
-    )
+    # Cached, so the metrics endpoint is only started once per process.
+    if os.getenv("METRICS_PORT"):
+        start_metrics_server(int(os.getenv("METRICS_PORT")))
+    return get_storage()
+
+@st.cache_resource(show_spinner="Loading the ADGM regulations index...")
+def initialize_agent():
+    """Initializes the agent and RAG pipeline on first analysis, cached for performance."""
+    print("Initializing the Corporate Agent for Streamlit...")
+    from core.rag_setup import create_rag_pipeline
+    from core.agent import ADGMCorporateAgent
     agent = ADGMCorporateAgent(create_rag_pipeline())
     print("Corporate Agent is ready.")
     return agent
 
-agent = initialize_agent()
+storage = initialize_services()
 
 # --- STREAMLIT UI ---
 
@@ -52,31 +52,38 @@ uploaded_files = st.file_uploader(
 if st.button("Analyze Documents", disabled=(not uploaded_files)):
     if uploaded_files:
         try:
-            with st.spinner("Analyzing documents... This may take a few moments."):
-                doc_urls = []
-                original_filenames = []
-                for uploaded_file in uploaded_files:
-                    public_id = f"adgm_docs/{uploaded_file.name}"
-                    upload_result = cloudinary.uploader.upload(
-                        uploaded_file, 
-                        resource_type="raw", 
-                        public_id=public_id, 
-                        overwrite=True
-                    )
-                    
-                    secure_url = upload_result.get('secure_url')
-                    if secure_url:
-                        doc_urls.append(secure_url)
-                        original_filenames.append(uploaded_file.name)
-                    else:
-                        st.error(f"Failed to upload {uploaded_file.name}. Please check Cloudinary credentials.")
-                
-                if doc_urls:
-                    final_report, downloadable_file_path = agent.analyze_and_prepare_downloads(doc_urls, original_filenames)
-                    
-                    st.session_state['final_report'] = final_report
-                    st.session_state['download_path'] = downloadable_file_path
-                    st.session_state['original_name'] = os.path.basename(downloadable_file_path) if downloadable_file_path else None
+            doc_bytes = []
+            original_filenames = []
+            for uploaded_file in uploaded_files:
+                # The upload is already in memory; hand the bytes straight to the agent.
+                data = uploaded_file.getvalue()
+                doc_bytes.append(data)
+                original_filenames.append(uploaded_file.name)
+                archive_in_background(storage, data, uploaded_file.name)
+
+            if doc_bytes:
+                # Render issues as each batch completes rather than behind a spinner for the whole job.
+                progress_bar = st.progress(0.0, text="Analyzing documents...")
+                live_report = st.empty()
+                partial_report = None
+                for event in initialize_agent().iter_analysis(doc_bytes, original_filenames):
+                    if event["type"] == "started":
+                        partial_report = event["report"]
+                    elif event["type"] == "batch":
+                        partial_report["issues_found"].extend(event["issues"])
+                        progress_bar.progress(
+                            event["batches_done"] / event["batches_total"],
+                            text=f"Reviewing {event['document']}: {event['batches_done']}/{event['batches_total']} batches"
+                        )
+                    elif event["type"] == "done":
+                        progress_bar.empty()
+                        live_report.empty()
+                        downloadable_file_path = event["download"]
+                        st.session_state['final_report'] = event["report"]
+                        st.session_state['download_path'] = downloadable_file_path
+                        st.session_state['original_name'] = os.path.basename(downloadable_file_path) if downloadable_file_path else None
+                        break
+                    live_report.json(partial_report)
 
         except Exception as e:
             st.error(f"An unexpected error occurred: {e}")
@@ -88,12 +95,12 @@ if 'final_report' in st.session_state:
     st.json(st.session_state['final_report'])
 
 if 'download_path' in st.session_state and st.session_state['download_path']:
-    st.markdown("### 📄 Download Reviewed Document")
+    st.markdown("### 📄 Download Reviewed Documents")
     
     with open(st.session_state['download_path'], "rb") as fp:
         st.download_button(
-            label="Download",
+            label="Download (.zip)",
             data=fp,
             file_name=st.session_state['original_name'],
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            mime="application/zip"
         )
\ No newline at end of file